@@ -0,0 +1,29 @@
+# UTILIDADES DE LAS COMPARATIVAS
+# ==============================================
+# Catálogo sintético y cronómetro para las comparativas de los módulos.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+import time
+
+import numpy as np
+
+from zara_data import read_dataset
+
+
+def synthetic_catalog(rows, seed=0):
+    """Catálogo real replicado hasta `rows` filas con ruido en precio y volumen"""
+    rng = np.random.default_rng(seed)
+    base = read_dataset()
+    data = base.iloc[np.arange(rows) % len(base)].reset_index(drop=True)
+    data['price'] = data['price'] * rng.lognormal(0, 0.2, rows)
+    data['Sales Volume'] = np.maximum(1, data['Sales Volume'] * rng.lognormal(0, 0.3, rows)).round()
+    data['Revenue'] = data['price'] * data['Sales Volume']
+    return data
+
+
+def timed(fn, *args, **kwargs):
+    """(resultado, segundos) de una llamada"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
@@ -0,0 +1,210 @@
+# CACHÉ COMPARTIDA ENTRE RÉPLICAS
+# ==============================================
+# Caché con TTL compartida entre procesos (SQLite en disco por defecto).
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Configuración por variables de entorno:
+#   ZARA_CACHE_BACKEND = sqlite | memory   (por defecto sqlite)
+#   ZARA_CACHE_PATH    = ruta del fichero SQLite (por defecto en ZARA_DATA_DIR)
+#   ZARA_CACHE_MAX_MB  = tamaño máximo antes de expulsar entradas
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from zara_data import DATA_CACHE_DIR
+
+DEFAULT_TTL = 24 * 3600  # Segundos
+CACHE_PATH = os.environ.get('ZARA_CACHE_PATH', os.path.join(DATA_CACHE_DIR, 'shared_cache.sqlite'))
+CACHE_MAX_BYTES = int(float(os.environ.get('ZARA_CACHE_MAX_MB', 256)) * 1e6)
+TOUCH_INTERVAL = 30  # Segundos entre escrituras agrupadas de la fecha de último acceso
+
+
+class MemoryBackend:
+    """Backend en memoria del proceso (desarrollo / una sola réplica)"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (blob, expires)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            blob, expires = entry
+            if expires < time.time():
+                self._size -= len(blob)
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return blob
+
+    def set(self, key, blob, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key)[0])
+            self._entries[key] = (blob, time.time() + ttl)
+            self._size += len(blob)
+            while self._size > self.max_bytes and self._entries:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._size -= len(old)
+
+
+class SQLiteBackend:
+    """Backend en un fichero SQLite compartido por todos los procesos del host"""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._touched = {}  # key -> último acceso aún no escrito
+        self._flushed = time.time()
+        self._touch_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _pending_touches(self, now, force=False):
+        """Accesos acumulados si toca escribirlos (cada TOUCH_INTERVAL o al escribir una entrada)"""
+        with self._touch_lock:
+            if not self._touched or (not force and now - self._flushed < TOUCH_INTERVAL):
+                return []
+            pending, self._touched, self._flushed = self._touched, {}, now
+        return [(accessed, key) for key, accessed in pending.items()]
+
+    def _write_touches(self, conn, touches):
+        conn.executemany("UPDATE entries SET accessed = MAX(accessed, ?) WHERE key = ?", touches)
+
+    def get(self, key):
+        # La lectura no toma el lock de escritura del WAL: el último acceso
+        # se anota en memoria y se escribe por lotes
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._touch_lock:
+            self._touched[key] = now
+        touches = self._pending_touches(now)
+        if touches:
+            with self._conn() as conn:
+                self._write_touches(conn, touches)
+        return row[0]
+
+    def set(self, key, blob, ttl):
+        now = time.time()
+        touches = self._pending_touches(now, force=True)  # La expulsión debe ver los accesos recientes
+        with self._conn() as conn:
+            self._write_touches(conn, touches)
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl, now)
+            )
+            conn.execute("DELETE FROM entries WHERE expires < ?", (now,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                # Expulsar las entradas menos usadas hasta volver al límite
+                excess = total - self.max_bytes
+                for old_key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                    if excess <= 0:
+                        break
+                    conn.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                    excess -= size
+
+
+def _canonical(value):
+    """Forma canónica de los argumentos: el mismo valor da siempre los mismos bytes"""
+    if hasattr(value, 'item') and not hasattr(value, '__len__'):
+        value = value.item()  # Escalares de numpy
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return ['float', repr(value)]
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [_canonical(v) for v in value]]
+    if isinstance(value, (set, frozenset)):
+        return ['set', sorted((_canonical(v) for v in value), key=json.dumps)]
+    if isinstance(value, dict):
+        return ['dict', sorted(([_canonical(k), _canonical(v)] for k, v in value.items()), key=json.dumps)]
+    raise TypeError(f"Argumento no admitido en la clave de shared_cache: {type(value).__name__}")
+
+
+def cache_key(arguments):
+    """Hash estable entre procesos de unos argumentos"""
+    encoded = json.dumps(_canonical(arguments), ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend configurado para este proceso (se crea una sola vez)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            kind = os.environ.get('ZARA_CACHE_BACKEND', 'sqlite')
+            _backend = MemoryBackend() if kind == 'memory' else SQLiteBackend()
+        return _backend
+
+
+def shared_cache(ttl=DEFAULT_TTL, backend=None):
+    """Como @st.cache_data pero en la caché compartida; los parámetros '_' no entran en la clave"""
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        # Nombre estable entre procesos (Streamlit ejecuta los scripts como __main__)
+        # + hash del bytecode para invalidar al cambiar la función
+        code_hash = hashlib.sha256(fn.__code__.co_code).hexdigest()[:8]
+        name = f"{os.path.basename(fn.__code__.co_filename)}:{fn.__qualname__}:{code_hash}"
+        stats = {"hits": 0, "misses": 0}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            hashed = {k: v for k, v in bound.arguments.items() if not k.startswith('_')}
+            key = name + ":" + cache_key(hashed)
+            store = backend or get_backend()
+            blob = store.get(key)
+            if blob is not None:
+                stats["hits"] += 1
+                return pickle.loads(blob)
+            stats["misses"] += 1
+            value = fn(*args, **kwargs)
+            store.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+            return value
+
+        wrapper.cache_stats = stats
+        return wrapper
+
+    return decorator
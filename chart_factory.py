@@ -0,0 +1,324 @@
+# FÁBRICA DE GRÁFICOS DEL DASHBOARD
+# ==============================================
+# Gráficos estándar con layout precompilado y figuras memoizadas por su input.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Comparativa con plotly.express (CPU y bytes por gráfico):
+#   python chart_factory.py
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from zara_data import data_fingerprint
+
+COLORS_3 = ['#000000', '#666666', '#999999']
+COLORS_2 = ['#000000', '#666666']
+COLORS_GROUP = ['#000000', '#444444', '#888888']
+SIZE_MAX = 20  # Igual que px.scatter
+MEMO_SIZE = 32  # Figuras memoizadas por gráfico
+
+# Columnas que lee cada gráfico: la huella de caché solo depende de ellas
+CHART_COLUMNS = {
+    'sales_by_position': ['Product Position', 'Sales Volume'],
+    'section_distribution': ['section', 'count'],
+    'price_volume': ['section', 'Product Position', 'name', 'price', 'Sales Volume', 'Revenue'],
+    'top_products': ['name', 'Revenue'],
+    'revenue_by_section_position': ['section', 'Product Position', 'Revenue'],
+    'price_histogram': ['desde', 'hasta', 'productos'],
+    'trend': ['period', 'revenue', 'units', 'avg_price'],
+}
+
+
+def _money(values):
+    """Importes a 2 decimales en float64 (en float32 el JSON crece)"""
+    return np.round(np.asarray(values, dtype=np.float64), 2)
+
+
+def _counts(values):
+    return np.asarray(values).astype(np.int32)
+
+
+def _codes(labels):
+    """Categorías → (códigos enteros, etiquetas únicas)"""
+    uniques, codes = np.unique(np.asarray(labels, dtype=object), return_inverse=True)
+    return codes.astype(np.int32), [str(u) for u in uniques]
+
+
+class _FrozenFigure(go.Figure):
+    """Figura serializada una vez; cada to_dict() devuelve una copia nueva"""
+
+    def __init__(self, traces, layout):
+        super().__init__(data=traces, layout=layout, _validate=False)
+        self._json = pio.to_json(super().to_dict(), validate=False)
+
+    def to_dict(self):
+        return json.loads(self._json)
+
+    def to_json(self, *args, **kwargs):
+        return super().to_json(*args, **kwargs) if args or kwargs else self._json
+
+
+def frozen_figure(spec):
+    """Figura desde un dict ya serializado (p. ej. de la vista prerenderizada), sin validarla"""
+    return _FrozenFigure(spec['data'], spec['layout'])
+
+
+def _category_axis(labels, title):
+    """Eje numérico que muestra las etiquetas de los códigos"""
+    return {"title": {"text": title}, "tickmode": "array",
+            "tickvals": list(range(len(labels))), "ticktext": labels}
+
+
+class ChartFactory:
+    """Layouts precompilados y figuras memoizadas por la huella de su input"""
+
+    def __init__(self):
+        self._layouts = {}
+        self._memo = {}  # nombre → OrderedDict(huella del input → figura)
+        self._lock = threading.Lock()
+        self.stats = {}  # nombre → {"cpu_ms", "bytes", "renders", "hits", "misses", "hit_rate"}
+
+    def _layout(self, name, **props):
+        # Se valida con go.Layout una sola vez; después solo se copia el dict
+        if name not in self._layouts:
+            props.setdefault('template', {})  # Streamlit aplica su propio tema
+            self._layouts[name] = go.Layout(**props).to_plotly_json()
+        return copy.deepcopy(self._layouts[name])
+
+    def _render(self, name, data, build, measure):
+        """Devuelve la figura de caché si el input agregado no ha cambiado"""
+        start = time.thread_time()
+        key = data_fingerprint(data[CHART_COLUMNS[name]])
+        with self._lock:
+            entry = self.stats.setdefault(name, {
+                "cpu_ms": 0.0, "bytes": None, "renders": 0, "hits": 0, "misses": 0, "hit_rate": 0.0
+            })
+            memo = self._memo.setdefault(name, OrderedDict())
+            fig = memo.get(key)
+            if fig is not None:
+                memo.move_to_end(key)
+                entry["hits"] += 1
+        if fig is None:
+            traces, layout = build(data)
+            fig = _FrozenFigure(traces, layout)
+            with self._lock:
+                memo[key] = fig
+                while len(memo) > MEMO_SIZE:
+                    memo.popitem(last=False)
+                entry["misses"] += 1
+        with self._lock:
+            entry["renders"] += 1
+            entry["hit_rate"] = entry["hits"] / entry["renders"]
+            entry["cpu_ms"] = (time.thread_time() - start) * 1000
+            if measure:
+                entry["bytes"] = len(fig.to_json())
+        return fig
+
+    def sales_by_position(self, data, measure=False):
+        return self._render('sales_by_position', data, self._build_sales_by_position, measure)
+
+    def section_distribution(self, data, measure=False):
+        return self._render('section_distribution', data, self._build_section_distribution, measure)
+
+    def price_volume(self, data, measure=False):
+        return self._render('price_volume', data, self._build_price_volume, measure)
+
+    def top_products(self, data, measure=False):
+        return self._render('top_products', data, self._build_top_products, measure)
+
+    def revenue_by_section_position(self, data, measure=False):
+        return self._render('revenue_by_section_position', data, self._build_revenue_by_section_position, measure)
+
+    def price_histogram(self, data, measure=False):
+        return self._render('price_histogram', data, self._build_price_histogram, measure)
+
+    def trend(self, data, measure=False):
+        return self._render('trend', data, self._build_trend, measure)
+
+    # ------------------------------------------
+    # Los gráficos
+    # ------------------------------------------
+    def _build_sales_by_position(self, data):
+        codes, labels = _codes(data['Product Position'])
+        layout = self._layout(
+            'sales_by_position', title={"text": "Distribución de Ventas por Posición"},
+            showlegend=False, height=400, yaxis={"title": {"text": "Unidades Vendidas"}},
+        )
+        layout['xaxis'] = _category_axis(labels, "Posición")
+        trace = {"type": "bar", "x": codes, "y": _counts(data['Sales Volume']),
+                 "marker": {"color": [COLORS_3[c % 3] for c in codes]},
+                 "hovertemplate": "%{customdata}<br>Unidades=%{y}<extra></extra>",
+                 "customdata": [labels[c] for c in codes]}
+        return [trace], layout
+
+    def _build_section_distribution(self, data):
+        layout = self._layout('section_distribution', title={"text": "Productos por Sección"})
+        trace = {"type": "pie", "labels": [str(v) for v in data['section']], "values": _counts(data['count']),
+                 "marker": {"colors": COLORS_2}, "textposition": "inside",
+                 "textinfo": "percent+label", "sort": False}
+        return [trace], layout
+
+    def _build_price_volume(self, data):
+        layout = self._layout(
+            'price_volume', title={"text": "Análisis Precio-Volumen (tamaño = revenue)"}, height=500,
+            xaxis={"title": {"text": "price"}}, yaxis={"title": {"text": "Sales Volume"}},
+            legend={"title": {"text": "section"}, "itemsizing": "constant"},
+        )
+        revenue = _money(data['Revenue'])
+        sizeref = 2.0 * float(revenue.max()) / SIZE_MAX ** 2 if len(revenue) else 1.0
+        traces = []
+        # Una traza por (sección, posición): ambas van como constantes en la
+        # traza en vez de repetirse en cada punto
+        groups = data.groupby(['section', 'Product Position'], observed=True, sort=True).indices
+        sections = sorted({section for section, _ in groups})
+        names = data['name'].to_numpy()  # Se decodifica una vez, no por grupo
+        for (section, position), rows in groups.items():
+            color = COLORS_2[sections.index(section) % 2]
+            traces.append({
+                "type": "scatter", "mode": "markers", "name": str(section), "legendgroup": str(section),
+                "showlegend": not any(t["legendgroup"] == str(section) for t in traces),
+                "x": _money(data['price'].to_numpy()[rows]),
+                "y": _counts(data['Sales Volume'].to_numpy()[rows]),
+                "customdata": names[rows].astype(object),
+                "marker": {"color": color, "size": revenue[rows], "sizemode": "area", "sizeref": sizeref},
+                "hovertemplate": (
+                    f"<b>%{{customdata}}</b><br>section={section}<br>Product Position={position}"
+                    "<br>price=%{x}<br>Sales Volume=%{y}<br>Revenue=%{marker.size}<extra></extra>"
+                ),
+            })
+        return traces, layout
+
+    def _build_top_products(self, data):
+        layout = self._layout(
+            'top_products', title={"text": "Los 10 Productos Más Rentables"}, height=400,
+            xaxis={"title": {"text": "Revenue"}}, yaxis={"title": {"text": "name"}, "categoryorder": "total ascending"},
+            coloraxis={"colorscale": "Greys", "colorbar": {"title": {"text": "Revenue"}}},
+        )
+        revenue = _money(data['Revenue'])
+        trace = {"type": "bar", "orientation": "h", "x": revenue, "y": [str(v) for v in data['name']],
+                 "marker": {"color": revenue, "coloraxis": "coloraxis"},
+                 "hovertemplate": "%{y}<br>Revenue=%{x}<extra></extra>"}
+        return [trace], layout
+
+    def _build_revenue_by_section_position(self, data):
+        section_codes, sections = _codes(data['section'])
+        layout = self._layout(
+            'revenue_by_section_position', title={"text": "Revenue Agrupado por Categorías"},
+            barmode='group', yaxis={"title": {"text": "Revenue"}},
+            legend={"title": {"text": "Product Position"}},
+        )
+        layout['xaxis'] = _category_axis(sections, "section")
+        traces = []
+        positions = data['Product Position'].to_numpy()
+        revenue = _money(data['Revenue'])
+        for i, position in enumerate(sorted(set(positions))):
+            rows = positions == position
+            traces.append({"type": "bar", "name": str(position), "x": section_codes[rows], "y": revenue[rows],
+                           "marker": {"color": COLORS_GROUP[i % 3]},
+                           "hovertemplate": f"{position}<br>Revenue=%{{y}}<extra></extra>"})
+        return traces, layout
+
+    def _build_price_histogram(self, data):
+        # Bins ya contados (sketches del cubo): solo se pintan las barras
+        layout = self._layout(
+            'price_histogram', title={"text": "Distribución de Precios"}, height=350, bargap=0.05,
+            xaxis={"title": {"text": "price"}}, yaxis={"title": {"text": "Productos"}},
+        )
+        low, high = _money(data['desde']), _money(data['hasta'])
+        trace = {"type": "bar", "x": (low + high) / 2, "width": high - low, "y": _counts(data['productos']),
+                 "marker": {"color": COLORS_3[0]}, "customdata": np.stack([low, high], axis=-1),
+                 "hovertemplate": "€%{customdata[0]:.0f}-%{customdata[1]:.0f}<br>Productos=%{y}<extra></extra>"}
+        return [trace], layout
+
+    def _build_trend(self, data):
+        # Tres paneles con el eje de fechas compartido: revenue, unidades y precio medio
+        layout = self._layout(
+            'trend', title={"text": "Evolución por Periodo"}, height=600, showlegend=False, hovermode='x unified',
+            xaxis={"type": "date", "anchor": "y3"},
+            yaxis={"title": {"text": "Revenue"}, "domain": [0.70, 1.0]},
+            yaxis2={"title": {"text": "Unidades"}, "domain": [0.36, 0.64], "anchor": "x"},
+            yaxis3={"title": {"text": "Precio medio"}, "domain": [0.0, 0.30], "anchor": "x"},
+        )
+        periods = pd.to_datetime(data['period']).dt.strftime('%Y-%m-%d').tolist()
+        traces = []
+        for axis, (column, label) in enumerate(
+            (('revenue', 'Revenue'), ('units', 'Unidades'), ('avg_price', 'Precio medio')), start=1
+        ):
+            traces.append({"type": "scatter", "mode": "lines+markers", "name": label, "x": periods,
+                           "y": _money(data[column]), "xaxis": "x", "yaxis": "y" if axis == 1 else f"y{axis}",
+                           "line": {"color": COLORS_3[axis - 1]}})
+        return traces, layout
+
+
+# ==============================================
+# COMPARATIVA CON PLOTLY EXPRESS
+# ==============================================
+def _express_figures(aggregates, df_filtered):
+    import plotly.express as px
+    return {
+        'sales_by_position': lambda: px.bar(
+            aggregates['sales_by_position'], x='Product Position', y='Sales Volume', color='Product Position',
+            color_discrete_sequence=COLORS_3, title="Distribución de Ventas por Posición"),
+        'section_distribution': lambda: px.pie(
+            aggregates['section_dist'], values='count', names='section', title="Productos por Sección",
+            color_discrete_sequence=COLORS_2),
+        'price_volume': lambda: px.scatter(
+            df_filtered, x='price', y='Sales Volume', color='section', size='Revenue',
+            hover_data=['name', 'Product Position'], color_discrete_sequence=COLORS_2),
+        'top_products': lambda: px.bar(
+            aggregates['top_products'], x='Revenue', y='name', orientation='h', color='Revenue',
+            color_continuous_scale='Greys'),
+        'revenue_by_section_position': lambda: px.bar(
+            aggregates['revenue_analysis'], x='section', y='Revenue', color='Product Position',
+            barmode='group', color_discrete_sequence=COLORS_GROUP),
+    }
+
+
+def main(repeat=5):
+    from zara_data import read_dataset
+    from zara_views import build_catalog, compute_aggregates, default_filters, filter_view
+
+    df = read_dataset()
+    filters = default_filters(build_catalog(df))
+    view = filter_view(df, filters)
+    df_filtered = view.frame(CHART_COLUMNS['price_volume'])
+    aggregates = compute_aggregates.__wrapped__(view, 'bench', filters)
+    factory = ChartFactory()
+    ours = {
+        'sales_by_position': lambda: factory.sales_by_position(aggregates['sales_by_position']),
+        'section_distribution': lambda: factory.section_distribution(aggregates['section_dist']),
+        'price_volume': lambda: factory.price_volume(df_filtered),
+        'top_products': lambda: factory.top_products(aggregates['top_products']),
+        'revenue_by_section_position': lambda: factory.revenue_by_section_position(aggregates['revenue_analysis']),
+    }
+
+    def cost(build, cold=True):
+        # CPU de construir + serializar (lo que hace st.plotly_chart), mediana
+        samples, size = [], 0
+        for _ in range(repeat):
+            if cold:
+                factory._memo.clear()
+            start = time.thread_time()
+            size = len(pio.to_json(build(), validate=False))
+            samples.append((time.thread_time() - start) * 1000)
+        return sorted(samples)[len(samples) // 2], size
+
+    print(f"{'gráfico':30} {'px ms':>8} {'fábrica ms':>11} {'caché ms':>9} {'px bytes':>10} {'fábrica bytes':>14}")
+    for name, build in _express_figures(aggregates, df_filtered).items():
+        px_ms, px_bytes = cost(build)
+        our_ms, our_bytes = cost(ours[name])
+        hit_ms, _ = cost(ours[name], cold=False)
+        print(f"{name:30} {px_ms:8.1f} {our_ms:11.1f} {hit_ms:9.2f} {px_bytes:10,} {our_bytes:14,}")
+
+
+if __name__ == '__main__':
+    main()
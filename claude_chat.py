@@ -0,0 +1,112 @@
+# CONVERSACIÓN MULTI-TURNO CON CLAUDE
+# ==============================================
+# Historial compacto + prompt caching del system prompt
+# y estadísticas de caché por sesión.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+HISTORY_TOKEN_BUDGET = 4000  # Tokens aprox. de historial antes de compactar
+KEEP_LAST_MESSAGES = 4       # Mensajes recientes que nunca se compactan
+SUMMARY_CHARS = 200          # Caracteres por mensaje en el resumen
+
+CACHE_CONTROL = {"type": "ephemeral"}
+USAGE_KEYS = ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens", "output_tokens")
+
+
+def estimate_tokens(text):
+    """Estimación barata de tokens (~4 caracteres por token)"""
+    return len(text) // 4 + 1
+
+
+def build_system(system_prompt):
+    """System prompt como bloque marcado para prompt caching"""
+    return [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+
+
+def _with_summary(messages, compaction):
+    """Mensajes desde el corte, con el resumen guardado delante del primero"""
+    tail = [dict(m) for m in messages[compaction.get("cut", 0):]]
+    if compaction.get("summary") and tail:
+        tail[0]["content"] = (
+            f"[Resumen de la conversación anterior]\n{compaction['summary']}\n\n"
+            f"[Pregunta actual]\n{tail[0]['content']}"
+        )
+    return tail
+
+
+def compact_history(messages, compaction=None, budget=HISTORY_TOKEN_BUDGET, keep_last=KEEP_LAST_MESSAGES):
+    """Resume los mensajes antiguos si el historial pasa de `budget` tokens.
+    Devuelve (mensajes, compactado en este turno)"""
+    compaction = {} if compaction is None else compaction
+    current = _with_summary(messages, compaction)
+    total = sum(estimate_tokens(m["content"]) for m in current)
+    if total <= budget or len(current) <= keep_last:
+        return current, False
+
+    # El primer mensaje conservado debe ser del usuario
+    start = compaction.get("cut", 0)
+    cut = len(messages) - keep_last
+    while cut < len(messages) and messages[cut]["role"] != "user":
+        cut += 1
+    if cut <= start or cut >= len(messages):
+        return current, False
+
+    lines = [compaction["summary"]] if compaction.get("summary") else []
+    lines += [f"- {m['role']}: {m['content'][:SUMMARY_CHARS].replace(chr(10), ' ')}" for m in messages[start:cut]]
+    summary = "\n".join(lines)
+    # El resumen tampoco puede crecer sin límite: un cuarto del presupuesto
+    # deja margen para varios turnos antes de la siguiente compactación
+    compaction["summary"] = summary[-(budget // 4) * 4:]
+    compaction["cut"] = cut
+    return _with_summary(messages, compaction), True
+
+
+def without_failed(messages):
+    """Historial para la API sin los turnos fallidos (mensajes con "error"): ni el error ni su pregunta"""
+    kept = []
+    for message in messages:
+        if message.get("error"):
+            if kept and kept[-1]["role"] == "user":
+                kept.pop()
+            continue
+        kept.append(message)
+    return kept
+
+
+def to_api_messages(messages):
+    """Historial en formato de la API con el último mensaje como punto de caché"""
+    api_messages = [{"role": m["role"], "content": m["content"]} for m in messages]
+    if api_messages:
+        last = api_messages[-1]
+        last["content"] = [{"type": "text", "text": last["content"], "cache_control": CACHE_CONTROL}]
+    return api_messages
+
+
+def new_usage_stats():
+    """Contadores de uso acumulados por sesión"""
+    return {
+        "turns": 0,
+        "input_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0,
+        "output_tokens": 0,
+        "compactions": 0,
+    }
+
+
+def record_usage(stats, usage):
+    """Suma el `usage` de una respuesta de la API a las estadísticas"""
+    for key in USAGE_KEYS:
+        stats[key] += getattr(usage, key, None) or 0
+
+
+def merge_usage(stats, other):
+    """Suma unas estadísticas de uso a otras"""
+    for key in USAGE_KEYS:
+        stats[key] += other[key]
+
+
+def cache_hit_ratio(stats):
+    """Fracción de tokens de entrada servidos desde la caché"""
+    total = stats["input_tokens"] + stats["cache_read_input_tokens"] + stats["cache_creation_input_tokens"]
+    return stats["cache_read_input_tokens"] / total if total else 0.0
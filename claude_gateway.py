@@ -0,0 +1,140 @@
+# GATEWAY DE PETICIONES A CLAUDE
+# ==============================================
+# Single-flight (peticiones idénticas en vuelo comparten una sola
+# llamada) + token bucket por API key con cola y backpressure.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+import hashlib
+import json
+import threading
+import time
+
+RATE_LIMIT_RPM = 50   # Peticiones por minuto por API key
+RATE_LIMIT_BURST = 5  # Peticiones que pueden salir de golpe
+MAX_QUEUE_WAIT = 30   # Segundos máximos de espera en cola
+FOLLOWER_TIMEOUT = 120  # Segundos que una petición coalescida espera al líder antes de llamar por su cuenta
+
+
+class RateLimitExceeded(Exception):
+    """La cola del token bucket supera MAX_QUEUE_WAIT"""
+
+    def __init__(self, wait):
+        super().__init__(f"Espera estimada de {wait:.0f}s")
+        self.wait = wait
+
+
+def key_fingerprint(api_key):
+    """Identificador estable de una API key sin guardarla en claro"""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+def request_key(api_key, *parts):
+    """Clave de coalescencia: API key + contenido completo de la petición"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return key_fingerprint(api_key) + ":" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TokenBucket:
+    """Token bucket con reservas: cada llamada obtiene su turno en la cola"""
+
+    def __init__(self, rate_per_minute=RATE_LIMIT_RPM, burst=RATE_LIMIT_BURST):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=MAX_QUEUE_WAIT):
+        """Reserva un token y devuelve los segundos que hay que esperar"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            if wait > max_wait:
+                self.tokens += 1
+                raise RateLimitExceeded(wait)
+            return wait
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class ClaudeGateway:
+    """Punto único, compartido por todo el proceso, delante de la API"""
+
+    def __init__(self, rate_per_minute=RATE_LIMIT_RPM, burst=RATE_LIMIT_BURST, max_wait=MAX_QUEUE_WAIT,
+                 follower_timeout=FOLLOWER_TIMEOUT):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_wait = max_wait
+        self.follower_timeout = follower_timeout
+        self._buckets = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "upstream": 0, "coalesced": 0, "queued": 0, "rejected": 0,
+                      "timeouts": 0}
+
+    def _bucket(self, api_key):
+        fingerprint = key_fingerprint(api_key)
+        with self._lock:
+            if fingerprint not in self._buckets:
+                self._buckets[fingerprint] = TokenBucket(self.rate_per_minute, self.burst)
+            return self._buckets[fingerprint]
+
+    def _upstream(self, api_key, fn, on_wait):
+        """Espera turno en el rate limit de la API key y llama a `fn()`"""
+        try:
+            wait = self._bucket(api_key).reserve(self.max_wait)
+        except RateLimitExceeded:
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise
+        if wait > 0:
+            with self._lock:
+                self.stats["queued"] += 1
+            if on_wait is not None:
+                on_wait(wait)
+            time.sleep(wait)
+        with self._lock:
+            self.stats["upstream"] += 1
+        return fn()
+
+    def call(self, api_key, key, fn, on_wait=None):
+        """Ejecuta `fn()` una sola vez por `key` en vuelo. Devuelve (resultado, compartido)"""
+        with self._lock:
+            self.stats["requests"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            if not flight.done.wait(self.follower_timeout):
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                return self._upstream(api_key, fn, on_wait), False
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = self._upstream(api_key, fn, on_wait)
+            return flight.result, False
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,243 @@
+# HERRAMIENTAS ANALÍTICAS PARA CLAUDE (TOOL USE)
+# ==============================================
+# Consultas locales de solo lectura sobre raw_zara que Claude puede
+# invocar en lugar de recibir un volcado estático de los datos.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from zara_data import data_fingerprint
+
+# ==============================================
+# ESQUEMA DEL DATASET
+# ==============================================
+DIMENSIONS = [
+    'section',
+    'Product Position',
+    'Promotion',
+    'Seasonal',
+    'Product Category',
+    'terms',
+]
+METRICS = ['Sales Volume', 'Revenue', 'price']
+AGGREGATIONS = ['sum', 'mean', 'median', 'count', 'min', 'max']
+
+MAX_ROWS = 50  # Tope de filas devueltas al modelo por llamada
+CACHE_SIZE = 256  # Resultados memoizados por instancia (LRU)
+
+_FILTERS_SCHEMA = {
+    "type": "object",
+    "description": (
+        "Filtros opcionales. Claves: nombres de dimensión; "
+        "valores: lista de valores permitidos."
+    ),
+    "properties": {dim: {"type": "array", "items": {"type": "string"}} for dim in DIMENSIONS},
+    "additionalProperties": False,
+}
+_PRICE_SCHEMA = {
+    "price_min": {"type": "number", "description": "Precio mínimo (inclusive)"},
+    "price_max": {"type": "number", "description": "Precio máximo (inclusive)"},
+}
+
+# Definiciones en el formato `tools` de la Messages API
+TOOL_DEFINITIONS = [
+    {
+        "name": "group_by",
+        "description": (
+            "Agrega una métrica agrupando por una o varias dimensiones del "
+            "catálogo. Úsala para comparar secciones, posiciones, promociones, etc."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "dimensions": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": DIMENSIONS},
+                    "minItems": 1,
+                },
+                "metric": {"type": "string", "enum": METRICS},
+                "agg": {"type": "string", "enum": AGGREGATIONS},
+                "filters": _FILTERS_SCHEMA,
+                **_PRICE_SCHEMA,
+            },
+            "required": ["dimensions", "metric", "agg"],
+        },
+    },
+    {
+        "name": "top_n",
+        "description": "Devuelve los N productos con mayor (o menor) valor de una métrica.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "metric": {"type": "string", "enum": METRICS},
+                "n": {"type": "integer", "minimum": 1, "maximum": MAX_ROWS},
+                "ascending": {"type": "boolean"},
+                "filters": _FILTERS_SCHEMA,
+                **_PRICE_SCHEMA,
+            },
+            "required": ["metric"],
+        },
+    },
+    {
+        "name": "price_histogram",
+        "description": (
+            "Histograma de precios en tramos de igual anchura, con unidades "
+            "vendidas y revenue por tramo."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "bins": {"type": "integer", "minimum": 2, "maximum": 30},
+                "filters": _FILTERS_SCHEMA,
+                **_PRICE_SCHEMA,
+            },
+        },
+    },
+]
+
+
+def _compact(value):
+    """Redondea floats para que el resultado ocupe pocos tokens; NaN/NA → None (JSON válido)"""
+    if hasattr(value, 'item'):
+        return _compact(value.item())
+    if isinstance(value, float):
+        return round(value, 2) if math.isfinite(value) else None
+    if value is not None and pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    return value
+
+
+def _table(frame):
+    """Convierte un DataFrame en {columns, rows} compacto"""
+    return {
+        "columns": list(frame.columns),
+        "rows": [[_compact(v) for v in row] for row in frame.itertuples(index=False)],
+    }
+
+
+class AnalyticsTools:
+    """Herramientas sobre un DataFrame con caché LRU por versión de los datos"""
+
+    def __init__(self, df, version=None, cache_size=CACHE_SIZE):
+        self.df = df
+        self.version = version or data_fingerprint(df)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (versión, herramienta, input) → JSON
+        self._lock = threading.Lock()  # La instancia se comparte entre sesiones
+
+    # ------------------------------------------
+    # Utilidades internas
+    # ------------------------------------------
+    def _subset(self, args):
+        mask = pd.Series(True, index=self.df.index)
+        for dim, values in (args.get('filters') or {}).items():
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Dimensión desconocida: {dim}")
+            mask &= self.df[dim].isin(values)
+        if args.get('price_min') is not None:
+            mask &= self.df['price'] >= args['price_min']
+        if args.get('price_max') is not None:
+            mask &= self.df['price'] <= args['price_max']
+        return self.df[mask]
+
+    def _group_by(self, args):
+        dims = args['dimensions']
+        metric, agg = args['metric'], args['agg']
+        unknown = [d for d in dims if d not in DIMENSIONS]
+        if unknown or metric not in METRICS or agg not in AGGREGATIONS:
+            raise ValueError("Dimensión, métrica o agregación no válida")
+        subset = self._subset(args)
+        result = (
+            subset.groupby(dims, observed=True)[metric]
+            .agg(agg)
+            .reset_index()
+            .sort_values(metric, ascending=False)
+            .head(MAX_ROWS)
+        )
+        return {"filas_filtradas": len(subset), **_table(result)}
+
+    def _top_n(self, args):
+        metric = args['metric']
+        if metric not in METRICS:
+            raise ValueError(f"Métrica no válida: {metric}")
+        n = min(int(args.get('n', 10)), MAX_ROWS)
+        subset = self._subset(args)
+        columns = ['name', 'section', 'Product Position', 'Promotion', 'price', 'Sales Volume', 'Revenue']
+        if args.get('ascending'):
+            top = subset.nsmallest(n, metric)
+        else:
+            top = subset.nlargest(n, metric)
+        return {"filas_filtradas": len(subset), **_table(top[columns])}
+
+    def _price_histogram(self, args):
+        bins = min(max(int(args.get('bins', 10)), 2), 30)
+        subset = self._subset(args).dropna(subset=['price'])
+        if subset.empty:
+            return {"filas_filtradas": 0, "columns": [], "rows": []}
+        buckets = pd.cut(subset['price'], bins=bins)
+        hist = (
+            subset.groupby(buckets, observed=False)
+            .agg(productos=('price', 'size'), unidades=('Sales Volume', 'sum'), revenue=('Revenue', 'sum'))
+            .reset_index()
+        )
+        hist['tramo'] = [f"{iv.left:.0f}-{iv.right:.0f}" for iv in hist['price']]
+        return {
+            "filas_filtradas": len(subset),
+            **_table(hist[['tramo', 'productos', 'unidades', 'revenue']]),
+        }
+
+    # ------------------------------------------
+    # API pública
+    # ------------------------------------------
+    def run(self, name, args, trace=None):
+        """Resultado de una herramienta como JSON; anota {tool, input, ms, cached} en `trace`"""
+        key = (self.version, name, json.dumps(args, sort_keys=True))
+        start = time.perf_counter()
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+        cached = result is not None
+        if not cached:
+            handler = {
+                'group_by': self._group_by,
+                'top_n': self._top_n,
+                'price_histogram': self._price_histogram,
+            }.get(name)
+            try:
+                if handler is None:
+                    raise ValueError(f"Herramienta desconocida: {name}")
+                payload = handler(args)
+            except (KeyError, ValueError, TypeError) as e:
+                payload = {"error": str(e)}
+            result = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+            with self._lock:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if trace is not None:
+            trace.append({"tool": name, "input": args, "ms": round(elapsed_ms, 2), "cached": cached})
+        return result
+
+
+def schema_summary(df):
+    """Contexto de tamaño constante: esquema y valores de cada dimensión"""
+    lines = [
+        "Dataset de Productos Zara (tabla raw_zara):",
+        f"- Filas: {len(df)}",
+        f"- Métricas: {', '.join(METRICS)} (Revenue = price * Sales Volume)",
+        "- Dimensiones y valores:",
+    ]
+    for dim in DIMENSIONS:
+        values = df[dim].dropna().unique()
+        lines.append(f"  - {dim}: {', '.join(map(str, values[:20]))}")
+    lines.append("Usa las herramientas para calcular cualquier cifra; no la inventes.")
+    return "\n".join(lines)
@@ -0,0 +1,121 @@
+# BENCHMARK DE ARRANQUE EN FRÍO
+# ==============================================
+# Mide el arranque en frío de cada script: primer pintado e imports.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso:
+#   python cold_start_bench.py                     # todos los scripts
+#   python cold_start_bench.py dashboard_completo.py --runs 5 --top 8
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ENTRY_POINTS = [
+    'dashboard_completo.py',
+    'notebook1_setup.py',
+    'notebook2_visualizations.py',
+    'notebook3_filters.py',
+    'notebook4_claude_ai.py',
+]
+BASELINE_SCRIPT = "import streamlit as st\nst.title('baseline')\n"
+
+
+def child(script):
+    """Se ejecuta dentro del proceso medido"""
+    t0 = float(os.environ['ZARA_BENCH_T0'])
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.testing.v1 import AppTest
+
+    first_paint = []
+    original = DeltaGenerator._enqueue
+
+    def enqueue(self, *args, **kwargs):
+        if not first_paint:
+            first_paint.append(time.time())
+        return original(self, *args, **kwargs)
+
+    DeltaGenerator._enqueue = enqueue
+    ready = time.time()  # Intérprete + streamlit importados
+    at = AppTest.from_file(script, default_timeout=300).run()
+    done = time.time()
+    print(json.dumps({
+        "runtime_ms": (ready - t0) * 1000,
+        "first_paint_ms": ((first_paint[0] if first_paint else done) - t0) * 1000,
+        "script_done_ms": (done - t0) * 1000,
+        "error": bool(at.exception),
+    }))
+
+
+def import_profile(stderr, top):
+    """Módulos de primer nivel con más tiempo acumulado de import"""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.split(':', 1)[1].split('|'))
+        if not cumulative.isdigit():
+            continue
+        package = name.strip().split('.')[0]
+        if name.strip() == package:  # Solo la raíz de cada paquete (ya incluye sus hijos)
+            totals[package] = max(totals[package], int(cumulative))
+    return sorted(totals.items(), key=lambda kv: -kv[1])[:top]
+
+
+def measure(script, runs):
+    samples, stderr = [], ''
+    for _ in range(runs):
+        env = dict(os.environ, ZARA_BENCH_T0=repr(time.time()))
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', __file__, '--child', script],
+            capture_output=True, text=True, env=env
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith('{')]
+        if not lines:
+            raise RuntimeError(f"{script}: {proc.stderr[-500:]}")
+        samples.append(json.loads(lines[-1]))
+        stderr = proc.stderr
+    return {
+        key: statistics.median(s[key] for s in samples)
+        for key in ('runtime_ms', 'first_paint_ms', 'script_done_ms')
+    }, any(s['error'] for s in samples), stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío (time-to-first-paint)")
+    parser.add_argument('scripts', nargs='*', default=ENTRY_POINTS)
+    parser.add_argument('--runs', type=int, default=3, help="Repeticiones por script (se usa la mediana)")
+    parser.add_argument('--top', type=int, default=6, help="Imports más caros a mostrar")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write(BASELINE_SCRIPT)
+    try:
+        scripts = [('(baseline streamlit)', f.name)] + [(s, s) for s in args.scripts]
+        print(f"{'script':34} {'runtime':>9} {'1st paint':>10} {'fin':>9}")
+        for label, path in scripts:
+            result, error, stderr = measure(path, args.runs)
+            flag = ' ⚠️ excepción' if error else ''
+            print(f"{label:34} {result['runtime_ms']:8.0f}ms {result['first_paint_ms']:9.0f}ms "
+                  f"{result['script_done_ms']:8.0f}ms{flag}")
+            if label != '(baseline streamlit)':
+                imports = ', '.join(f"{name} {us / 1000:.0f}ms" for name, us in import_profile(stderr, args.top))
+                print(f"{'':34} imports: {imports}")
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == '__main__':
+    main()
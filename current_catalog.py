@@ -0,0 +1,200 @@
+# CATÁLOGO ACTUAL: ÚLTIMA FILA DE CADA PRODUCT ID
+# ==============================================
+# Catálogo actual: la última fila scrapeada de cada Product ID.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Simulación de meses de scrapes diarios (ingesta incremental vs deduplicar todo):
+#   python current_catalog.py --days 360
+
+import argparse
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from price_parsing import parsing_signature
+from shared_dataset import DATA_CACHE_DIR, appended_parts, map_dataset, publish_dataset
+from zara_views import decoded
+
+KEY = 'Product ID'
+CURRENT_PATH = os.environ.get('ZARA_CURRENT_PATH', os.path.join(DATA_CACHE_DIR, 'current_catalog.pkl'))
+
+
+def latest_rows(rows, timestamps):
+    """La fila más reciente de cada Product ID de un lote (el orden de llegada desempata)"""
+    order = np.argsort(timestamps.to_numpy(), kind='stable')
+    rows, timestamps = rows.iloc[order], timestamps.iloc[order]
+    last = ~rows[KEY].duplicated(keep='last').to_numpy()
+    return rows[last].reset_index(drop=True), timestamps[last].reset_index(drop=True)
+
+
+def _signature():
+    return hashlib.sha256(parsing_signature()).hexdigest()[:12]
+
+
+class CurrentCatalog:
+    """Vista materializada de un proceso; la tabla publicada nunca se modifica en sitio"""
+
+    def __init__(self, path=CURRENT_PATH):
+        self.path = path
+        self.version = None  # Versión del dataset que refleja la tabla (None: lotes sueltos)
+        self.parts = None  # {libro: versión} de esa versión, si es una ingesta
+        self.signature = _signature()
+        self.table = None  # Una fila por Product ID
+        self.times = np.array([], dtype='datetime64[us]')  # scraped_at de cada fila de table
+        self.index = pd.Index([], dtype='int64')  # Product ID → posición en table
+        self.stats = {"batches": 0, "rebuilds": 0, "rows": 0, "inserted": 0, "updated": 0, "older": 0,
+                      "last_ms": 0.0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            # Tabla de otro parseo de precios (u otro formato): se rehace desde el dataset
+            if state.get('signature') != self.signature:
+                return
+            self.version, self.parts = state['version'], state.get('parts')
+            self.table, self.times = state['table'], state['times']
+            self.index = pd.Index(self.table[KEY])
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            state = {'signature': self.signature, 'version': self.version, 'parts': self.parts,
+                     'table': self.table, 'times': self.times}
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)  # Escritura atómica
+
+    def ingest(self, data, version=None, parts=None):
+        """Pliega las filas nuevas (o rehace la tabla) y devuelve cuántas"""
+        start = time.perf_counter()
+        with self._lock:
+            if version is not None and version == self.version:
+                return 0
+            rebuild = version is not None
+            added = appended_parts(self.parts, parts) if rebuild and self.table is not None else None
+            if added is not None:
+                data, rebuild = data[data['source'].isin(added).to_numpy()], False
+            timestamps = pd.to_datetime(data['scraped_at'], errors='coerce', format='ISO8601')
+            valid = (timestamps.notna() & data[KEY].notna()).to_numpy(copy=True)
+            if version is None and not valid.any():
+                return 0
+            rows, batch_times = latest_rows(decoded(data[valid]), timestamps[valid])
+            ids, batch_times = rows[KEY].to_numpy(), batch_times.to_numpy(dtype=self.times.dtype)
+
+            if rebuild or self.table is None:
+                table, index, times = rows, pd.Index(ids), batch_times
+                known = replace = np.zeros(len(rows), dtype=bool)
+            else:
+                rows = rows.reindex(columns=self.table.columns)
+                positions = self.index.get_indexer(ids)
+                known = positions >= 0
+                # El lote gana si su scrape del producto es igual o posterior al guardado
+                replace = known.copy()
+                replace[known] = batch_times[known] >= self.times[positions[known]]
+                table, times = self.table.copy(), self.times.copy()
+                for j, column in enumerate(table.columns):
+                    table.iloc[positions[replace], j] = rows[column].to_numpy()[replace]
+                times[positions[replace]] = batch_times[replace]
+                index = self.index
+                if not known.all():
+                    table = pd.concat([table, rows[~known]], ignore_index=True)
+                    times = np.concatenate([times, batch_times[~known]])
+                    index = index.append(pd.Index(ids[~known]))
+
+            self.table, self.index, self.times = table, index, times
+            self.version, self.parts = version, parts if version is not None else None
+            self._save()
+            self.stats["batches"] += 1
+            self.stats["rebuilds"] += int(rebuild)
+            self.stats["rows"] += int(valid.sum())
+            self.stats["inserted"] += int((~known).sum())
+            self.stats["updated"] += int(replace.sum())
+            self.stats["older"] += int((known & ~replace).sum())
+            self.stats["last_ms"] = (time.perf_counter() - start) * 1000
+            return int(valid.sum())
+
+    def publish(self, directory=DATA_CACHE_DIR):
+        """Publica la tabla como dataset Arrow compartido y la devuelve mapeada"""
+        if self.version is None:
+            raise ValueError("El catálogo actual no refleja ninguna versión del dataset (solo lotes sueltos)")
+        current_version = f"{self.version}-actual"
+        return map_dataset(publish_dataset(self.table, current_version, directory)), current_version
+
+
+def load_current_catalog(data, version, parts=None, path=CURRENT_PATH, directory=DATA_CACHE_DIR):
+    """Catálogo actual de un dataset, al día desde el persistido, y publicado: (df, versión)"""
+    catalog = CurrentCatalog(path)
+    catalog.ingest(data, version, parts)
+    return catalog.publish(directory)
+
+
+# ==============================================
+# SIMULACIÓN DE HISTÓRICO
+# ==============================================
+def main():
+    from trend_rollups import synthetic_batch
+    from zara_data import read_dataset
+
+    parser = argparse.ArgumentParser(description="Catálogo actual incremental sobre scrapes diarios simulados")
+    parser.add_argument('--days', type=int, default=360)
+    args = parser.parse_args()
+
+    base = read_dataset()
+    catalog = CurrentCatalog(path=None)
+    history, parts = [], {}
+
+    def add_workbook(name, batch):
+        history.append(batch.assign(source=name))
+        parts[name] = f"{name}-v1"
+
+    print(f"{'días':>6} {'histórico':>10} {'productos':>10} {'ingesta ms':>11} {'deduplicar todo ms':>19}")
+    for day in range(args.days):
+        # Cada día llega un libro nuevo a la ingesta; cada versión es la unión, como la que publica el refresco
+        batch = synthetic_batch(base, day)
+        add_workbook(f"dia-{day}", batch)
+        if day == args.days // 2:
+            # Una corrección de precios del scrape de hoy con la misma hora (debe entrar)
+            add_workbook("correccion", batch.assign(price=batch['price'] * 2))
+        raw = pd.concat(history, ignore_index=True)
+        catalog.ingest(raw, str(day), dict(parts))
+        if day == args.days // 2:
+            # Después, un mercado que llega tarde con un scrape de hace 10 días (no debe pisar nada)
+            add_workbook("mercado-tardio", synthetic_batch(base, max(day - 10, 0), seed=1))
+            raw = pd.concat(history, ignore_index=True)
+            catalog.ingest(raw, f"{day}-tardio", dict(parts))
+        if day + 1 in (1, 30, 180, args.days):
+            # Referencia: deduplicar todo el histórico, como haría cada rerun sin la vista
+            start = time.perf_counter()
+            raw = raw.assign(_t=pd.to_datetime(raw['scraped_at'], format='ISO8601'))
+            full = raw.sort_values('_t', kind='stable').drop_duplicates(KEY, keep='last')
+            full_ms = (time.perf_counter() - start) * 1000
+            assert len(full) == len(catalog.table)
+            for column in ('Sales Volume', 'price'):
+                assert np.allclose(full.set_index(KEY)[column].sort_index(),
+                                   catalog.table.set_index(KEY)[column].sort_index(), equal_nan=True)
+            print(f"{day + 1:6} {len(raw):10,} {len(catalog.table):10,} {catalog.stats['last_ms']:11.1f} {full_ms:19.1f}")
+
+    assert catalog.stats['rebuilds'] == 1  # Solo la primera versión
+
+    # Si se reescribe un libro ya plegado (aquí, el único que queda), la tabla se rehace desde el dataset
+    catalog.ingest(base.assign(source='dia-0'), 'reescrito', {'dia-0': 'dia-0-v2'})
+    assert catalog.stats['rebuilds'] == 2
+    assert np.allclose(catalog.table.set_index(KEY)['Sales Volume'].sort_index(),
+                       base.set_index(KEY)['Sales Volume'].sort_index())
+    print(f"✅ {catalog.stats['batches']} versiones con {catalog.stats['rebuilds']} reconstrucciones · "
+          f"{catalog.stats['older']:,} filas de scrapes antiguos descartadas")
+
+
+if __name__ == '__main__':
+    main()
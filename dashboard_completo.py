@@ -4,9 +4,25 @@
 # Autor: Workshop Zara Analytics
 # ==============================================
 
+import os
+import time
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+
+from current_catalog import CurrentCatalog
+from data_refresher import DataRefresher, format_age
+from insights_batch import SEGMENT_DIMENSIONS, insights_path, load_insights, segment_key_for_filters
+from shared_dataset import current_source, source_stamp, source_version
+from static_view import build_static_view, load_static_view, static_view_path
+from trend_rollups import GRAINS, TREND_WINDOW, TrendRollups
+from usage_log import record_filter_state
+from zara_views import (
+    TABLE_COLUMNS, FilteredView, compute_aggregates, compute_effects, count_matches, default_filters, describe_view,
+    export_csv, filter_view, filters_key, prepare_dataset, price_histogram, view_kpis, warm_view
+)
+
+FILTER_DEBOUNCE = 0.8  # Segundos sin cambios antes de aplicar los filtros en modo en vivo
 
 # ==============================================
 # CONFIGURACIÓN DE LA PÁGINA
@@ -20,16 +36,50 @@ st.set_page_config(
 # ==============================================
 # FUNCIÓN PARA CARGAR DATOS
 # ==============================================
-@st.cache_data
-def load_data():
-    """Carga y limpia los datos del Excel"""
-    df = pd.read_excel('EADIC_claude_test.xlsx', sheet_name='raw_zara')
-    df['price'] = pd.to_numeric(df['price'], errors='coerce')
-    df['Revenue'] = df['price'] * df['Sales Volume']
-    return df
-
-# Cargar datos
-df = load_data()
+@st.cache_data(max_entries=4)
+def load_ai_insights(version, insights_mtime):
+    """Insights de IA precalculados por insights_batch.py para esta versión (la fecha del fichero invalida)"""
+    return load_insights(version)
+
+def warm_default_view(snapshot):
+    """Precalcula la vista por defecto de cada nueva versión fuera del camino de las peticiones"""
+    current = snapshot.extras['current']
+    warm_view(current['df'], current['version'], default_filters(current['catalog']))
+
+@st.cache_resource  # Un único refresco por proceso; los DataFrames no se copian por sesión
+def get_refresher():
+    """Vigila el origen (ingesta de varios libros o Excel) y publica nuevas versiones en segundo plano"""
+    refresher = DataRefresher()
+    refresher.add_builder('history', lambda snap: prepare_dataset(snap.df, snap.version))
+
+    # Viven entre versiones y se persisten: tras un reinicio la misma versión no se recalcula
+    current = CurrentCatalog()
+    trends = TrendRollups()
+
+    def update_current(snap):
+        current.ingest(snap.df, snap.version, snap.parts)
+        return prepare_dataset(*current.publish())
+
+    refresher.add_builder('current', update_current)
+    refresher.add_builder('default_view', warm_default_view)
+    refresher.add_builder('static_view', build_static_view)  # Primer pintado de las sesiones nuevas
+
+    def update_trends(snap):
+        trends.ingest(snap.df, snap.version, snap.parts)
+        return trends.snapshot()  # Las sesiones del snapshot anterior siguen viendo sus tablas
+
+    refresher.add_builder('trends', update_trends)
+    return refresher.start()
+
+@st.cache_resource(max_entries=4)
+def get_source_version(stamp):
+    """Versión del dataset del origen (se recalcula solo si cambia su sello)"""
+    return source_version(stamp[0])
+
+@st.cache_resource(max_entries=4)
+def get_static_view(dataset_version, view_mtime):
+    """Vista por defecto prerenderizada de esa versión del dataset (None si aún no se ha generado)"""
+    return load_static_view(dataset_version)
 
 # ==============================================
 # HEADER PRINCIPAL
@@ -44,68 +94,257 @@ st.markdown("---")
 st.sidebar.title("🎛️ Filtros y Configuración")
 st.sidebar.markdown("---")
 
-# Filtro: Sección
-selected_section = st.sidebar.multiselect(
-    "📊 Sección",
-    options=df['section'].unique(),
-    default=df['section'].unique(),
-    help="Selecciona las secciones a mostrar"
+# Catálogo actual (materializado al ingerir) o todas las filas de todos los scrapes
+show_history = st.sidebar.toggle(
+    "🗂️ Histórico completo",
+    value=False,
+    help="Desactivado, cada Product ID cuenta una sola vez con su último scrape (catálogo actual)"
 )
 
-# Filtro: Posición en Tienda
-selected_position = st.sidebar.multiselect(
-    "📍 Posición en Tienda",
-    options=df['Product Position'].unique(),
-    default=df['Product Position'].unique(),
-    help="Filtra por posición del producto en tienda"
+# Modo en bloque: los cambios se acumulan en el navegador hasta pulsar "Aplicar"
+batch_filters = st.sidebar.toggle(
+    "📦 Aplicar filtros en bloque",
+    value=False,
+    help="Edita varios filtros y recalcula el dashboard una sola vez al aplicar"
 )
 
-# Filtro: Promoción
-selected_promotion = st.sidebar.multiselect(
-    "🏷️ En Promoción",
-    options=df['Promotion'].unique(),
-    default=df['Promotion'].unique(),
-    help="Filtra productos en promoción"
-)
+# Sesión nueva: si hay vista prerenderizada de la versión vigente del
+# dataset, el catálogo de los filtros sale de ella y el dataset no se carga todavía
+static_view = None
+if not st.session_state.get('interactive') and not show_history:
+    source_dataset_version = get_source_version(source_stamp(current_source()))
+    view_path = static_view_path(source_dataset_version)
+    view_mtime = os.path.getmtime(view_path) if os.path.exists(view_path) else None
+    static_view = get_static_view(source_dataset_version, view_mtime)
+
+if static_view is None:
+    # Cargar datos: el snapshot vigente se mantiene durante todo el rerun
+    snapshot = get_refresher().current()
+    dataset = snapshot.extras['history' if show_history else 'current']
+    catalog = dataset['catalog']
+else:
+    catalog = static_view['catalog']
+
+def filter_widgets(container):
+    """Widgets de filtros; devuelve la clave de los valores seleccionados"""
+    # Filtro: Búsqueda de texto (índice de trigramas sobre name, description y terms)
+    search = container.text_input(
+        "🔎 Buscar producto",
+        key="filter_search",
+        placeholder="puffer, leather jacket...",
+        help="Busca en nombre, descripción y categoría; todas las palabras deben aparecer"
+    )
 
-# Filtro: Estacional
-selected_seasonal = st.sidebar.multiselect(
-    "🌦️ Estacional",
-    options=df['Seasonal'].unique(),
-    default=df['Seasonal'].unique(),
-    help="Filtra productos estacionales"
-)
+    # Filtro: Sección
+    selected_section = container.multiselect(
+        "📊 Sección",
+        options=catalog['section'],
+        default=catalog['section'],
+        key="filter_section",
+        help="Selecciona las secciones a mostrar"
+    )
 
-# Filtro: Rango de Precio
-price_range = st.sidebar.slider(
-    "💰 Rango de Precio (€)",
-    min_value=float(df['price'].min()),
-    max_value=float(df['price'].max()),
-    value=(float(df['price'].min()), float(df['price'].max())),
-    help="Ajusta el rango de precios"
-)
+    # Filtro: Posición en Tienda
+    selected_position = container.multiselect(
+        "📍 Posición en Tienda",
+        options=catalog['Product Position'],
+        default=catalog['Product Position'],
+        key="filter_position",
+        help="Filtra por posición del producto en tienda"
+    )
+
+    # Filtro: Promoción
+    selected_promotion = container.multiselect(
+        "🏷️ En Promoción",
+        options=catalog['Promotion'],
+        default=catalog['Promotion'],
+        key="filter_promotion",
+        help="Filtra productos en promoción"
+    )
+
+    # Filtro: Estacional
+    selected_seasonal = container.multiselect(
+        "🌦️ Estacional",
+        options=catalog['Seasonal'],
+        default=catalog['Seasonal'],
+        key="filter_seasonal",
+        help="Filtra productos estacionales"
+    )
+
+    # Filtro: Rango de Precio
+    price_range = container.slider(
+        "💰 Rango de Precio (€)",
+        min_value=catalog['price'][0],
+        max_value=catalog['price'][1],
+        value=catalog['price'],
+        key="filter_price",
+        help="Ajusta el rango de precios"
+    )
+
+    # Clave estable de los filtros para la caché compartida
+    return filters_key(
+        selected_section, selected_position, selected_promotion, selected_seasonal, price_range, search
+    )
+
+if batch_filters:
+    with st.sidebar.form("filters_form"):
+        staged_filters = filter_widgets(st)
+        st.form_submit_button("✅ Aplicar filtros", use_container_width=True)
+else:
+    staged_filters = filter_widgets(st.sidebar)
 
 st.sidebar.markdown("---")
 
+# ==============================================
+# VISTA POR DEFECTO PRERENDERIZADA
+# ==============================================
+def show_kpis(kpis, totals):
+    """Las cuatro métricas principales de una vista frente al total"""
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric(
+            "Total Productos",
+            f"{kpis['products']:,}",
+            delta=f"{kpis['products'] - totals['products']} vs total"
+        )
+
+    with col2:
+        st.metric(
+            "Revenue Total",
+            f"€{kpis['revenue']:,.0f}",
+            delta=f"{(kpis['revenue']/totals['revenue']*100):.1f}% del total"
+        )
+
+    with col3:
+        st.metric(
+            "Precio Promedio",
+            f"€{kpis['avg_price']:.2f}",
+            delta=f"€{kpis['avg_price'] - totals['avg_price']:.2f}"
+        )
+
+    with col4:
+        st.metric(
+            "Unidades Vendidas",
+            f"{kpis['units']:,}",
+            delta=f"{(kpis['units']/totals['units']*100):.1f}% del total"
+        )
+
+if static_view is not None and staged_filters == default_filters(catalog):
+    # Todo sale del JSON precalculado: ni dataset, ni filtros, ni agregados
+    kpis, totals = static_view['kpis'], static_view['totals']
+    st.sidebar.success(f"✅ **{kpis['products']}** productos seleccionados de **{totals['products']}** totales")
+    if st.sidebar.button("⚡ Explorar en detalle", help="Carga el dashboard interactivo sin cambiar los filtros"):
+        st.session_state.interactive = True
+        st.rerun()
+
+    st.subheader("📊 Métricas Principales")
+    show_kpis(kpis, totals)
+    st.markdown("---")
+
+    st.subheader("📈 Análisis Visual")
+    from chart_factory import frozen_figure
+
+    figures = static_view['figures']
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Ventas por Posición en Tienda")
+        st.plotly_chart(frozen_figure(figures['sales_by_position']), use_container_width=True)
+    with col2:
+        st.markdown("### Distribución por Sección")
+        st.plotly_chart(frozen_figure(figures['section_distribution']), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Top 10 Productos por Revenue")
+        st.plotly_chart(frozen_figure(figures['top_products']), use_container_width=True)
+    with col2:
+        st.markdown("### Revenue por Sección y Posición")
+        st.plotly_chart(frozen_figure(figures['revenue_by_section_position']), use_container_width=True)
+
+    st.markdown("##### 🏆 Top 20 Productos por Revenue")
+    st.dataframe(
+        pd.DataFrame(static_view['top_20']['data'], columns=static_view['top_20']['columns']),
+        use_container_width=True,
+        height=400
+    )
+
+    rendered = pd.Timestamp.fromtimestamp(static_view['rendered_at']).strftime('%d/%m/%Y %H:%M')
+    st.caption(
+        f"⚡ Vista por defecto precalculada (versión `{static_view['version']}`, {rendered}). "
+        "Cambia un filtro o pulsa **Explorar en detalle** para el gráfico precio-volumen, "
+        "las tendencias, las estadísticas y la exploración de datos."
+    )
+
+    # La página ya está pintada: se deja el pipeline listo para el primer cambio de filtros
+    get_refresher()
+    st.stop()
+
+st.session_state.interactive = True
+if static_view is not None:
+    # Primer cambio de filtros de la sesión: se engancha el pipeline interactivo
+    snapshot = get_refresher().current()
+    dataset = snapshot.extras['current']
+df, data_version = dataset['df'], dataset['version']
+filter_index = dataset['filter_index']
+sketches = dataset['sketches']
+
 # ==============================================
 # APLICAR FILTROS
 # ==============================================
-df_filtered = df[
-    (df['section'].isin(selected_section)) &
-    (df['Product Position'].isin(selected_position)) &
-    (df['Promotion'].isin(selected_promotion)) &
-    (df['Seasonal'].isin(selected_seasonal)) &
-    (df['price'] >= price_range[0]) &
-    (df['price'] <= price_range[1])
-]
+# En bloque, el formulario ya agrupa los cambios. En vivo, los cambios
+# seguidos se aplican juntos cuando pasan FILTER_DEBOUNCE segundos sin
+# tocar ningún filtro; mientras tanto se sirve la vista ya calculada.
+now = time.time()
+if st.session_state.get('staged_filters') != staged_filters:
+    st.session_state.staged_filters = staged_filters
+    st.session_state.staged_at = now
+if (batch_filters or 'applied_filters' not in st.session_state
+        or now - st.session_state.staged_at >= FILTER_DEBOUNCE):
+    st.session_state.applied_filters = staged_filters
+active_filters = st.session_state.applied_filters
+filters_pending = active_filters != staged_filters
+
+@st.fragment(run_every=FILTER_DEBOUNCE)
+def apply_pending_filters():
+    """Lanza el rerun completo cuando los filtros llevan FILTER_DEBOUNCE segundos quietos"""
+    if time.time() - st.session_state.staged_at >= FILTER_DEBOUNCE:
+        st.rerun()
+
+if filters_pending:
+    # Vista previa barata: recuento desde el índice, sin filtrar el DataFrame
+    st.sidebar.info(f"⏳ **{count_matches(filter_index, staged_filters)}** productos con los filtros nuevos...")
+    with st.sidebar:
+        apply_pending_filters()
+
+@st.cache_resource(max_entries=16)
+def get_filtered_view(_data, _index, version, filters):
+    """Filas de unos filtros como posiciones, compartidas entre sesiones"""
+    return filter_view(_data, filters, _index)
+
+view = get_filtered_view(df, filter_index, data_version, active_filters)
+
+# Registrar los estados de filtros usados (alimenta el warm-up de populares)
+if st.session_state.get('last_logged_filters') != active_filters:
+    st.session_state.last_logged_filters = active_filters
+    record_filter_state(active_filters)
+aggregates = compute_aggregates(view, data_version, active_filters)
 
 # Información de filtros
-st.sidebar.success(f"✅ **{len(df_filtered)}** productos seleccionados de **{len(df)}** totales")
+st.sidebar.success(f"✅ **{len(view)}** productos seleccionados de **{len(df)}** totales")
 
 # Botón de reset en sidebar
 if st.sidebar.button("🔄 Resetear Todos los Filtros"):
     st.rerun()
 
+# Cuartiles, mediana e histograma: de los sketches por celda salvo que se pida el cálculo exacto
+exact_stats = st.sidebar.toggle(
+    "🎯 Estadísticas exactas",
+    value=False,
+    help=f"Desactivado, los cuantiles se fusionan de sketches precalculados (error relativo ≤ {sketches.accuracy:.0%})"
+)
+stats, approximate_stats = describe_view(view, sketches, data_version, active_filters, exact_stats)
+
 st.sidebar.markdown("---")
 st.sidebar.info("💡 **Tip:** Usa los filtros para explorar diferentes segmentos de productos")
 
@@ -114,38 +353,7 @@ st.sidebar.info("💡 **Tip:** Usa los filtros para explorar diferentes segmento
 # ==============================================
 st.subheader("📊 Métricas Principales")
 
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.metric(
-        "Total Productos",
-        f"{len(df_filtered):,}",
-        delta=f"{len(df_filtered) - len(df)} vs total"
-    )
-
-with col2:
-    total_revenue = df_filtered['Revenue'].sum()
-    st.metric(
-        "Revenue Total",
-        f"€{total_revenue:,.0f}",
-        delta=f"{(total_revenue/df['Revenue'].sum()*100):.1f}% del total"
-    )
-
-with col3:
-    avg_price = df_filtered['price'].mean()
-    st.metric(
-        "Precio Promedio",
-        f"€{avg_price:.2f}",
-        delta=f"€{avg_price - df['price'].mean():.2f}"
-    )
-
-with col4:
-    total_sales = df_filtered['Sales Volume'].sum()
-    st.metric(
-        "Unidades Vendidas",
-        f"{total_sales:,}",
-        delta=f"{(total_sales/df['Sales Volume'].sum()*100):.1f}% del total"
-    )
+show_kpis(view_kpis(view), view_kpis(FilteredView(df)))
 
 st.markdown("---")
 
@@ -154,95 +362,95 @@ st.markdown("---")
 # ==============================================
 st.subheader("📈 Análisis Visual")
 
-# Primera fila de gráficos
-col1, col2 = st.columns(2)
+# Importación diferida: cabecera, filtros y KPIs se pintan antes de cargar plotly
+from chart_factory import CHART_COLUMNS, ChartFactory
 
-with col1:
-    st.markdown("### Ventas por Posición en Tienda")
-    sales_by_position = df_filtered.groupby('Product Position')['Sales Volume'].sum().reset_index()
-    
-    fig1 = px.bar(
-        sales_by_position,
-        x='Product Position',
-        y='Sales Volume',
-        color='Product Position',
-        color_discrete_sequence=['#000000', '#666666', '#999999'],
-        title="Distribución de Ventas por Posición"
-    )
-    fig1.update_layout(
-        showlegend=False,
-        height=400,
-        xaxis_title="Posición",
-        yaxis_title="Unidades Vendidas"
-    )
-    st.plotly_chart(fig1, use_container_width=True)
+@st.cache_resource
+def get_chart_factory():
+    """Layouts de los gráficos construidos una vez por proceso"""
+    return ChartFactory()
 
-with col2:
-    st.markdown("### Distribución por Sección")
-    section_dist = df_filtered['section'].value_counts().reset_index()
-    section_dist.columns = ['section', 'count']
-    
-    fig2 = px.pie(
-        section_dist,
-        values='count',
-        names='section',
-        title="Productos por Sección",
-        color_discrete_sequence=['#000000', '#666666']
-    )
-    fig2.update_traces(textposition='inside', textinfo='percent+label')
-    st.plotly_chart(fig2, use_container_width=True)
-
-# Segunda fila: Scatter plot completo
-st.markdown("### Relación Precio vs Volumen de Ventas")
-fig3 = px.scatter(
-    df_filtered,
-    x='price',
-    y='Sales Volume',
-    color='section',
-    size='Revenue',
-    hover_data=['name', 'Product Position'],
-    title="Análisis Precio-Volumen (tamaño = revenue)",
-    color_discrete_sequence=['#000000', '#666666']
-)
-fig3.update_layout(height=500)
-st.plotly_chart(fig3, use_container_width=True)
+@st.fragment
+def charts_section(aggregates, view):
+    """Los cinco gráficos; "Medir gráficos" solo reejecuta esta sección"""
+    charts = get_chart_factory()
 
-# Tercera fila de gráficos
-col1, col2 = st.columns(2)
+    # Medición de CPU y bytes por gráfico (serializa cada figura una vez más)
+    measure_charts = st.toggle("📏 Medir gráficos", value=False)
 
-with col1:
-    st.markdown("### Top 10 Productos por Revenue")
-    top_products = df_filtered.nlargest(10, 'Revenue')[['name', 'Revenue']]
-    
-    fig4 = px.bar(
-        top_products,
-        x='Revenue',
-        y='name',
-        orientation='h',
-        title="Los 10 Productos Más Rentables",
-        color='Revenue',
-        color_continuous_scale='Greys'
+    # Primera fila de gráficos
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("### Ventas por Posición en Tienda")
+        fig1 = charts.sales_by_position(aggregates['sales_by_position'], measure=measure_charts)
+        st.plotly_chart(fig1, use_container_width=True)
+
+    with col2:
+        st.markdown("### Distribución por Sección")
+        fig2 = charts.section_distribution(aggregates['section_dist'], measure=measure_charts)
+        st.plotly_chart(fig2, use_container_width=True)
+
+    # Segunda fila: Scatter plot completo
+    st.markdown("### Relación Precio vs Volumen de Ventas")
+    fig3 = charts.price_volume(view.frame(CHART_COLUMNS['price_volume']), measure=measure_charts)
+    st.plotly_chart(fig3, use_container_width=True)
+
+    # Tercera fila de gráficos
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("### Top 10 Productos por Revenue")
+        fig4 = charts.top_products(aggregates['top_products'], measure=measure_charts)
+        st.plotly_chart(fig4, use_container_width=True)
+
+    with col2:
+        st.markdown("### Revenue por Sección y Posición")
+        fig5 = charts.revenue_by_section_position(aggregates['revenue_analysis'], measure=measure_charts)
+        st.plotly_chart(fig5, use_container_width=True)
+
+    # Coste de servidor y tamaño enviado por gráfico
+    if measure_charts:
+        with st.expander("📏 Rendimiento de los gráficos"):
+            chart_stats = pd.DataFrame(charts.stats).T
+            chart_stats['hit_rate'] = (chart_stats['hit_rate'] * 100).round(1)
+            st.dataframe(
+                chart_stats.rename(columns={
+                    'cpu_ms': 'CPU (ms)', 'bytes': 'Bytes enviados', 'renders': 'Renders',
+                    'hits': 'Aciertos caché', 'misses': 'Fallos caché', 'hit_rate': 'Tasa de aciertos (%)'
+                }),
+                use_container_width=True
+            )
+
+charts_section(aggregates, view)
+
+st.markdown("---")
+
+# ==============================================
+# TENDENCIAS (ROLLUPS POR SCRAPED_AT)
+# ==============================================
+st.subheader("📅 Tendencias")
+
+@st.fragment
+def trends_section(trends, selections):
+    """Evolución desde los rollups; cambiar la granularidad solo reejecuta esta sección"""
+    grain = st.radio(
+        "Granularidad",
+        GRAINS,
+        format_func={'daily': 'Diaria', 'weekly': 'Semanal'}.get,
+        horizontal=True
     )
-    fig4.update_layout(
-        height=400,
-        yaxis={'categoryorder':'total ascending'}
+    trend = trends.trend(grain, selections)
+    if trend.empty:
+        st.caption("Aún no hay filas con scraped_at en los rollups.")
+        return
+    st.plotly_chart(get_chart_factory().trend(trend), use_container_width=True)
+    st.caption(
+        f"Últimos {TREND_WINDOW[grain]} periodos con datos hasta {trends.latest:%d/%m/%Y %H:%M} · "
+        "aplica sección, posición y promoción (no temporada, precio ni búsqueda)"
     )
-    st.plotly_chart(fig4, use_container_width=True)
 
-with col2:
-    st.markdown("### Revenue por Sección y Posición")
-    revenue_analysis = df_filtered.groupby(['section', 'Product Position'])['Revenue'].sum().reset_index()
-    
-    fig5 = px.bar(
-        revenue_analysis,
-        x='section',
-        y='Revenue',
-        color='Product Position',
-        barmode='group',
-        title="Revenue Agrupado por Categorías",
-        color_discrete_sequence=['#000000', '#444444', '#888888']
-    )
-    st.plotly_chart(fig5, use_container_width=True)
+trends_section(snapshot.extras['trends'], active_filters[:3])
 
 st.markdown("---")
 
@@ -252,35 +460,35 @@ st.markdown("---")
 st.subheader("📋 Exploración de Datos")
 
 # Tabs para organizar información
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "📊 Todos los Datos", 
     "🏆 Top 20 por Revenue", 
     "📈 Estadísticas Descriptivas",
-    "💡 Insights"
+    "💡 Insights",
+    "🎯 Promoción y Precio"
 ])
 
 with tab1:
-    st.markdown("##### Tabla Completa de Productos Filtrados")
+    st.markdown("##### Tabla de Productos Filtrados (el CSV incluye todas las columnas)")
     st.dataframe(
-        df_filtered,
+        view.frame(TABLE_COLUMNS),
         use_container_width=True,
         height=400
     )
     
-    # Botón de descarga
-    csv = df_filtered.to_csv(index=False).encode('utf-8')
+    # Botón de descarga (on_click="ignore": descargar no provoca rerun)
+    csv = export_csv(view, data_version, active_filters)
     st.download_button(
         label="📥 Descargar Datos Filtrados (CSV)",
         data=csv,
         file_name=f"zara_filtered_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv",
-        mime="text/csv"
+        mime="text/csv",
+        on_click="ignore"
     )
 
 with tab2:
     st.markdown("##### Top 20 Productos por Revenue")
-    top_20 = df_filtered.nlargest(20, 'Revenue')[
-        ['name', 'section', 'Product Position', 'price', 'Sales Volume', 'Revenue', 'Promotion']
-    ]
+    top_20 = aggregates['top_20']
     st.dataframe(
         top_20,
         use_container_width=True,
@@ -295,42 +503,111 @@ with tab3:
     with col1:
         st.markdown("**Variables Numéricas:**")
         st.dataframe(
-            df_filtered[['price', 'Sales Volume', 'Revenue']].describe(),
+            stats,
             use_container_width=True
         )
+        if approximate_stats:
+            st.caption(f"≈ Cuartiles de sketches fusionados (error relativo ≤ {sketches.accuracy:.0%}); "
+                       "count, mean, std, min y max son exactos.")
+        fig_prices = get_chart_factory().price_histogram(
+            price_histogram(view, sketches, active_filters, exact_stats)
+        )
+        st.plotly_chart(fig_prices, use_container_width=True)
     
     with col2:
         st.markdown("**Información General:**")
-        st.write(f"- **Total de registros:** {len(df_filtered):,}")
-        st.write(f"- **Productos únicos:** {df_filtered['name'].nunique():,}")
-        st.write(f"- **Secciones:** {', '.join(df_filtered['section'].unique())}")
-        st.write(f"- **Posiciones:** {', '.join(df_filtered['Product Position'].unique())}")
-        st.write(f"- **Productos en promoción:** {len(df_filtered[df_filtered['Promotion'] == 'Yes']):,}")
-        st.write(f"- **Productos estacionales:** {len(df_filtered[df_filtered['Seasonal'] == 'Yes']):,}")
+        st.write(f"- **Total de registros:** {len(view):,}")
+        st.write(f"- **Productos únicos:** {view.column('name').nunique():,}")
+        st.write(f"- **Secciones:** {', '.join(view.column('section').unique())}")
+        st.write(f"- **Posiciones:** {', '.join(view.column('Product Position').unique())}")
+        st.write(f"- **Productos en promoción:** {(view.column('Promotion') == 'Yes').sum():,}")
+        st.write(f"- **Productos estacionales:** {(view.column('Seasonal') == 'Yes').sum():,}")
 
 with tab4:
     st.markdown("##### 💡 Insights Automáticos")
     
-    # Producto más caro
-    most_expensive = df_filtered.nlargest(1, 'price').iloc[0]
-    st.info(f"🔝 **Producto más caro:** {most_expensive['name']} - €{most_expensive['price']:.2f}")
-    
-    # Producto más vendido
-    best_seller = df_filtered.nlargest(1, 'Sales Volume').iloc[0]
-    st.success(f"🏆 **Producto más vendido:** {best_seller['name']} - {best_seller['Sales Volume']:,} unidades")
-    
-    # Mayor revenue
-    top_revenue = df_filtered.nlargest(1, 'Revenue').iloc[0]
-    st.warning(f"💰 **Mayor revenue:** {top_revenue['name']} - €{top_revenue['Revenue']:,.0f}")
+    highlights = view.frame(['name', 'price', 'Sales Volume', 'Revenue'])
+
+    if highlights.empty:
+        st.info("Ningún producto cumple los filtros actuales.")
+    else:
+        # Producto más caro
+        most_expensive = highlights.nlargest(1, 'price').iloc[0]
+        st.info(f"🔝 **Producto más caro:** {most_expensive['name']} - €{most_expensive['price']:.2f}")
+
+        # Producto más vendido
+        best_seller = highlights.nlargest(1, 'Sales Volume').iloc[0]
+        st.success(f"🏆 **Producto más vendido:** {best_seller['name']} - {best_seller['Sales Volume']:,} unidades")
+
+        # Mayor revenue
+        top_revenue = highlights.nlargest(1, 'Revenue').iloc[0]
+        st.warning(f"💰 **Mayor revenue:** {top_revenue['name']} - €{top_revenue['Revenue']:,.0f}")
     
     # Análisis de precios
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Precio Mínimo", f"€{df_filtered['price'].min():.2f}")
+        st.metric("Precio Mínimo", f"€{stats.loc['min', 'price']:.2f}")
     with col2:
-        st.metric("Precio Mediano", f"€{df_filtered['price'].median():.2f}")
+        st.metric("Precio Mediano", f"{'≈' if approximate_stats else ''}€{stats.loc['50%', 'price']:.2f}")
     with col3:
-        st.metric("Precio Máximo", f"€{df_filtered['price'].max():.2f}")
+        st.metric("Precio Máximo", f"€{stats.loc['max', 'price']:.2f}")
+    
+    # Insights de IA precalculados para el segmento activo
+    st.markdown("##### 🤖 Insights de IA del Segmento")
+    # Generados sobre el dataset completo; la fecha del fichero recoge una ejecución nueva del job
+    insights_file = insights_path(snapshot.version)
+    insights_mtime = os.path.getmtime(insights_file) if os.path.exists(insights_file) else None
+    ai_insights = load_ai_insights(snapshot.version, insights_mtime)
+    segment = segment_key_for_filters(
+        {dim: catalog[dim] for dim in SEGMENT_DIMENSIONS},
+        dict(zip(SEGMENT_DIMENSIONS, active_filters[:4]))
+    )
+    if not ai_insights:
+        st.caption("Sin insights precalculados para esta versión de datos. Ejecuta `python insights_batch.py`.")
+    elif segment is None or segment not in ai_insights:
+        st.caption("Selecciona un único valor o todos en cada filtro para ver el insight del segmento.")
+    else:
+        st.markdown(ai_insights[segment])
+        if active_filters[4] != catalog['price'] or active_filters[5]:
+            st.caption("ℹ️ Calculado sobre todo el segmento, sin el rango de precios ni la búsqueda.")
+
+with tab5:
+    st.markdown("##### 🎯 Efecto de Promoción, Posición y Precio por Segmento")
+    st.caption(
+        "Lift de promoción: unidades medias con promoción frente a sin ella. "
+        "Lift de posición: frente al resto de posiciones de la misma sección y categoría. "
+        "Elasticidad: pendiente log-log de unidades sobre precio. Entre corchetes, IC al 95%."
+    )
+    effects = compute_effects(view, data_version, active_filters)
+
+    if effects.empty:
+        st.info("Ningún producto cumple los filtros actuales.")
+    else:
+        def interval(low, high, scale=100, unit='%', digits=1):
+            return f"[{low * scale:+.{digits}f}{unit}, {high * scale:+.{digits}f}{unit}]" if pd.notna(low) else "—"
+
+        def significant(low, high):
+            return "✅" if pd.notna(low) and (low > 0 or high < 0) else ""
+
+        st.dataframe(
+            pd.DataFrame({
+                'Sección': effects['section'],
+                'Categoría': effects['Product Category'],
+                'Posición': effects['Product Position'],
+                'Filas': effects['rows'],
+                'Lift promoción (%)': (effects['promo_lift'] * 100).round(1),
+                'IC promoción': [interval(l, h) for l, h in zip(effects['promo_lift_low'], effects['promo_lift_high'])],
+                'Promo. sig.': [significant(l, h) for l, h in zip(effects['promo_lift_low'], effects['promo_lift_high'])],
+                'Lift posición (%)': (effects['position_lift'] * 100).round(1),
+                'IC posición': [interval(l, h) for l, h in zip(effects['position_lift_low'], effects['position_lift_high'])],
+                'Elasticidad': effects['elasticity'].round(2),
+                'IC elasticidad': [
+                    interval(l, h, scale=1, unit='', digits=2) for l, h in zip(effects['elasticity_low'], effects['elasticity_high'])
+                ],
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
 
 # ==============================================
 # FOOTER
@@ -344,9 +621,14 @@ with col1:
     st.caption("Powered by Streamlit")
 
 with col2:
-    st.markdown(f"**🕐 Última actualización:** {pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S')}")
-
-with col3:
+    # Versión servida y antigüedad real de los datos (no la hora del rerun)
+    data_date = pd.Timestamp.fromtimestamp(snapshot.source_mtime).strftime('%d/%m/%Y %H:%M')
+    st.markdown(f"**🕐 Datos:** versión `{data_version}` · {format_age(snapshot.age_seconds())}")
+    st.caption(f"Origen del {data_date} · cargado en {snapshot.build_seconds:.1f}s")
+
+@st.fragment
+def about_panel():
+    """Información del dashboard: no depende de los datos, solo se reejecuta este fragmento"""
     if st.button("ℹ️ Acerca de"):
         st.info("""
         **Dashboard Interactivo de Análisis de Productos Zara**
@@ -361,3 +643,6 @@ with col3:
         
         Versión: 1.0 | Workshop 2026
         """)
+
+with col3:
+    about_panel()
@@ -0,0 +1,124 @@
+# REFRESCO DE DATOS EN SEGUNDO PLANO (STALE-WHILE-REVALIDATE)
+# ==============================================
+# Hilo que reconstruye el dataset cuando cambia el origen y lo publica con un swap.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+import os
+import threading
+import time
+
+from shared_dataset import DATA_CACHE_DIR, current_source, load_source, source_parts, source_stamp, source_version
+
+POLL_INTERVAL = 30  # Segundos entre comprobaciones del fichero
+MAX_RETRY_INTERVAL = 15 * 60  # Tope del reintento de un origen que no se pudo construir
+
+
+class DatasetSnapshot:
+    """Versión inmutable del dataset y de todo lo que se deriva de ella"""
+
+    def __init__(self, df, version, source_mtime, parts=None):
+        self.df = df
+        self.version = version
+        self.source_mtime = source_mtime
+        self.parts = parts  # {libro: versión} si el origen es una ingesta (ver source_parts)
+        self.loaded_at = time.time()
+        self.build_seconds = 0.0
+        self.extras = {}  # Resultado de cada builder registrado
+
+    def age_seconds(self):
+        """Antigüedad de los datos de origen"""
+        return time.time() - self.source_mtime
+
+
+class DataRefresher:
+    """Mantiene el snapshot actual y lo renueva en un hilo de fondo"""
+
+    def __init__(self, data_path=None, poll_interval=POLL_INTERVAL, cache_dir=DATA_CACHE_DIR):
+        self.data_path = data_path
+        self.poll_interval = poll_interval
+        self.cache_dir = cache_dir
+        self._builders = {}
+        self._current = None
+        self._stamp = None
+        self._failed = None  # (sello que falló, fallos seguidos, no reintentar antes de)
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    def add_builder(self, name, fn):
+        """Registra fn(snapshot) que se precalcula en cada nueva versión"""
+        self._builders[name] = fn
+
+    def current(self):
+        """Snapshot vigente (nunca espera a una recarga en curso)"""
+        return self._current
+
+    def _file_stamp(self):
+        """(origen, mtime, tamaño): data_path None sigue al manifiesto de ingesta en cuanto aparece"""
+        return source_stamp(current_source(self.data_path))
+
+    def _build(self, stamp):
+        start = time.perf_counter()
+        source = stamp[0]
+        if self._current is not None and source_version(source) == self._current.version:
+            self._current.source_mtime = stamp[1]  # Mismo contenido, fichero más reciente
+            return self._current
+        df, version = load_source(source, self.cache_dir)
+        snapshot = DatasetSnapshot(df, version, stamp[1], source_parts(source, version))
+        for name, fn in self._builders.items():
+            snapshot.extras[name] = fn(snapshot)
+        snapshot.build_seconds = time.perf_counter() - start
+        return snapshot
+
+    def refresh(self):
+        """Comprueba el origen y, si ha cambiado, construye y publica la nueva versión"""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        if self._failed is not None and self._failed[0] == stamp and time.time() < self._failed[2]:
+            return False  # El mismo origen roto: no se reconstruye en cada ciclo
+        try:
+            snapshot = self._build(stamp)
+        except Exception:
+            failures = self._failed[1] + 1 if self._failed is not None and self._failed[0] == stamp else 1
+            delay = min(self.poll_interval * 2 ** failures, MAX_RETRY_INTERVAL)
+            self._failed = (stamp, failures, time.time() + delay)
+            raise
+        self._failed = None
+        changed = snapshot is not self._current
+        self._current = snapshot  # Swap atómico de la referencia
+        self._stamp = stamp
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+                if self._failed is None:  # Mientras se espera al reintento, el error sigue a la vista
+                    self.last_error = None
+            except Exception as e:  # El hilo no puede morir: se reintenta en el siguiente ciclo
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def start(self):
+        """Carga inicial síncrona y arranque del hilo de vigilancia"""
+        if self._current is None:
+            self.refresh()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="zara-data-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def format_age(seconds):
+    """'hace 5 min', 'hace 3 h'... para el indicador de antigüedad"""
+    if seconds < 60:
+        return "hace unos segundos"
+    if seconds < 3600:
+        return f"hace {seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"hace {seconds / 3600:.0f} h"
+    return f"hace {seconds / 86400:.0f} días"
@@ -0,0 +1,160 @@
+# INGESTA EN PARALELO DE VARIOS LIBROS DE SCRAPING
+# ==============================================
+# Ingesta en paralelo de varios libros de scraping a un dataset Arrow.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso:
+#   python ingest_workbooks.py scrapes/ --workers 8
+#   python ingest_workbooks.py "scrapes/*_2024-02-*.xlsx" --sheet raw_zara
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from price_parsing import parsing_version
+from shared_dataset import DATA_CACHE_DIR, MANIFEST_PATH, publish_dataset, read_manifest
+from zara_data import QUARANTINE_DIR, SHEET_NAME, dataset_version, parse_dataset
+
+WORKBOOK_PATTERNS = ('*.xlsx', '*.xlsm')
+
+
+def discover(sources):
+    """Ficheros de una lista de directorios, rutas o patrones glob (ordenados, sin repetir)"""
+    found = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for pattern in WORKBOOK_PATTERNS:
+                found.update(glob.glob(os.path.join(source, pattern)))
+        else:
+            found.update(path for path in glob.glob(source) if os.path.isfile(path))
+    # Los ficheros de bloqueo de Excel (~$libro.xlsx) no son libros
+    return sorted(path for path in found if not os.path.basename(path).startswith('~$'))
+
+
+def parse_workbook(path, sheet_name=SHEET_NAME, quarantine_dir=QUARANTINE_DIR):
+    """Lee y normaliza un libro sin lanzar. Devuelve (DataFrame o None, informe)"""
+    start = time.perf_counter()
+    report = {"file": path, "rows": 0, "mb": os.path.getsize(path) / 1e6, "seconds": 0.0,
+              "version": None, "ambiguous": 0, "rejected": 0, "error": None}
+    try:
+        df, issues = parse_dataset(path, sheet_name, quarantine_dir)
+        df['source'] = os.path.splitext(os.path.basename(path))[0]
+        report["rows"] = len(df)
+        report["version"] = dataset_version(path)
+        report["ambiguous"] = int((issues['action'] == 'ambigua').sum())
+        report["rejected"] = len(issues) - report["ambiguous"]
+    except Exception as e:  # Libro corrupto, sin la hoja, etc.: se informa y se sigue
+        df = None
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["seconds"] = time.perf_counter() - start
+    return df, report
+
+
+def ingest(paths, workers=None, sheet_name=SHEET_NAME, directory=DATA_CACHE_DIR, on_file=None):
+    """Parsea los libros en paralelo y publica la unión. Devuelve (versión, ruta, informes)"""
+    frames, reports = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        quarantine_dir = os.path.join(directory, os.path.basename(QUARANTINE_DIR))
+        futures = {pool.submit(parse_workbook, path, sheet_name, quarantine_dir): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                df, report = future.result()
+            except Exception as e:  # El proceso murió (p. ej. sin memoria con un libro enorme)
+                df, report = None, {"file": path, "rows": 0, "mb": 0.0, "seconds": 0.0, "version": None,
+                                    "ambiguous": 0, "rejected": 0, "error": f"{type(e).__name__}: {e}"}
+            if df is not None:
+                frames[path] = df
+            reports[path] = report
+            if on_file is not None:
+                on_file(report)
+
+    reports = [reports[path] for path in paths]
+    if not frames:
+        return None, None, reports
+    # Versión de la unión: depende del contenido de cada libro ingerido, no del orden de llegada
+    digest = hashlib.sha256()
+    for report in reports:
+        if report["error"] is None:
+            digest.update(f"{os.path.basename(report['file'])}:{report['version']};".encode())
+    version = digest.hexdigest()[:12]
+    merged = pd.concat([frames[path] for path in paths if path in frames], ignore_index=True)
+    path = publish_dataset(merged, version, directory)
+    return version, path, reports
+
+
+def save_manifest(version, path, reports, manifest=MANIFEST_PATH, sheet_name=SHEET_NAME):
+    """Guarda el manifiesto de la última ingesta, que pasa a ser el origen de datos"""
+    os.makedirs(os.path.dirname(manifest) or '.', exist_ok=True)
+    tmp = f"{manifest}.{os.getpid()}.tmp"
+    # Rutas absolutas: el dashboard o un job pueden arrancar desde otro directorio
+    reports = [dict(report, file=os.path.abspath(report["file"])) for report in reports]
+    content = {"version": version, "path": os.path.abspath(path), "sheet": sheet_name,
+               "parsing": parsing_version(), "files": reports}
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(content, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, manifest)  # Escritura atómica
+
+
+def reingest(manifest=MANIFEST_PATH, workers=None):
+    """Vuelve a ingerir los libros del manifiesto y devuelve el manifiesto nuevo"""
+    previous = read_manifest(manifest)
+    paths = [report["file"] for report in previous["files"] if report["error"] is None]
+    sheet_name = previous.get("sheet", SHEET_NAME)
+    version, path, reports = ingest(paths, workers, sheet_name, os.path.dirname(manifest) or '.')
+    if version is None:
+        raise RuntimeError(f"Ningún libro de {manifest} se pudo volver a ingerir")
+    save_manifest(version, path, reports, manifest, sheet_name)
+    return read_manifest(manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta en paralelo de libros de scraping")
+    parser.add_argument('sources', nargs='+', help="Directorios, ficheros o patrones glob")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--sheet', default=SHEET_NAME)
+    parser.add_argument('--out', default=DATA_CACHE_DIR)
+    args = parser.parse_args()
+
+    paths = discover(args.sources)
+    if not paths:
+        parser.error("no se encontró ningún libro")
+
+    def show(report):
+        if report["error"]:
+            print(f"   ❌ {report['file']}: {report['error']}")
+        else:
+            seconds = max(report["seconds"], 1e-9)
+            print(f"   ✅ {report['file']}: {report['rows']:,} filas en {seconds:.2f}s "
+                  f"({report['rows'] / seconds:,.0f} filas/s · {report['mb'] / seconds:.1f} MB/s)")
+            if report["ambiguous"] or report["rejected"]:
+                print(f"      ⚠️ precios en cuarentena: {report['ambiguous']} ambiguos (fecha de Excel), "
+                      f"{report['rejected']} rechazados")
+
+    print(f"📥 {len(paths)} libros con {args.workers} procesos")
+    start = time.perf_counter()
+    version, path, reports = ingest(paths, args.workers, args.sheet, args.out, on_file=show)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(report["error"] is not None for report in reports)
+    rows = sum(report["rows"] for report in reports)
+    if version is None:
+        print(f"❌ Ningún libro se pudo leer ({failed} errores)")
+        raise SystemExit(1)
+    save_manifest(version, path, reports, os.path.join(args.out, os.path.basename(MANIFEST_PATH)), args.sheet)
+    print(f"✅ {rows:,} filas de {len(paths) - failed} libros ({failed} con error) en {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} filas/s) → {path}")
+    rejected = sum(report["rejected"] + report["ambiguous"] for report in reports)
+    if rejected:
+        print(f"   ⚠️ {rejected:,} filas sin precio válido: ver {os.path.join(args.out, os.path.basename(QUARANTINE_DIR))}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+# JOB OFFLINE: INSIGHTS DE IA POR SEGMENTO
+# ==============================================
+# Un insight de IA por segmento y versión del dataset, generado fuera del dashboard.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso:
+#   python insights_batch.py --backend local
+#   python insights_batch.py --backend claude --concurrency 4
+#
+# El backend `claude` usa ANTHROPIC_API_KEY (y ANTHROPIC_BASE_URL si se
+# quiere apuntar a un servidor local de pruebas).
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shared_dataset import load_shared_dataset
+from zara_data import DATA_CACHE_DIR
+
+SEGMENT_DIMENSIONS = ['section', 'Product Position', 'Promotion', 'Seasonal']
+ALL = '*'  # Comodín: la dimensión no está filtrada
+
+INSIGHTS_DIR = os.path.join(DATA_CACHE_DIR, 'insights')
+DEFAULT_CONCURRENCY = 4
+MODEL = "claude-sonnet-4-20250514"
+
+SYSTEM_PROMPT = """Eres un analista de datos experto trabajando con datos de productos de Zara.
+Recibirás las métricas de un segmento del catálogo. Escribe 2-3 insights
+accionables en español, en viñetas Markdown, usando las cifras dadas."""
+
+
+# ==============================================
+# SEGMENTOS
+# ==============================================
+def segment_key(segment):
+    """Clave estable de un segmento, p. ej. 'section=MAN|Promotion=*|...'"""
+    return "|".join(f"{dim}={segment[dim]}" for dim in SEGMENT_DIMENSIONS)
+
+
+def enumerate_segments(df):
+    """Todas las combinaciones de valor concreto o comodín por dimensión"""
+    choices = [[ALL] + sorted(df[dim].dropna().unique()) for dim in SEGMENT_DIMENSIONS]
+    return [dict(zip(SEGMENT_DIMENSIONS, combo)) for combo in itertools.product(*choices)]
+
+
+def segment_key_for_filters(options, selections):
+    """Clave de segmento de los filtros activos, o None si alguno tiene varios valores"""
+    segment = {}
+    for dim in SEGMENT_DIMENSIONS:
+        selected = set(selections[dim])
+        if selected == set(options[dim]):
+            segment[dim] = ALL
+        elif len(selected) == 1:
+            segment[dim] = selected.pop()
+        else:
+            return None
+    return segment_key(segment)
+
+
+def segment_stats(df, segment):
+    """Métricas compactas de un segmento (None si está vacío)"""
+    mask = df.index == df.index
+    for dim in SEGMENT_DIMENSIONS:
+        if segment[dim] != ALL:
+            mask &= df[dim] == segment[dim]
+    subset = df[mask]
+    if subset.empty:
+        return None
+    top = subset.nlargest(3, 'Revenue')
+    return {
+        "segmento": {dim: segment[dim] for dim in SEGMENT_DIMENSIONS},
+        "productos": len(subset),
+        "revenue": round(float(subset['Revenue'].sum()), 2),
+        "unidades": int(subset['Sales Volume'].sum()),
+        "precio_medio": round(float(subset['price'].mean()), 2),
+        "ventas_medias_promocion": {
+            str(k): round(float(v), 1)
+            for k, v in subset.groupby('Promotion')['Sales Volume'].mean().items()
+        },
+        "top_productos": [
+            {"name": row['name'], "revenue": round(float(row['Revenue']), 2)}
+            for _, row in top.iterrows()
+        ],
+    }
+
+
+# ==============================================
+# BACKENDS
+# ==============================================
+def insight_local(stats):
+    """Insight determinista sin API (stand-in local)"""
+    lines = [
+        f"- **{stats['productos']}** productos, revenue de **€{stats['revenue']:,.0f}** "
+        f"y precio medio de **€{stats['precio_medio']:.2f}**.",
+        f"- Producto líder: **{stats['top_productos'][0]['name']}** "
+        f"(€{stats['top_productos'][0]['revenue']:,.0f}).",
+    ]
+    promo = stats['ventas_medias_promocion']
+    if 'Yes' in promo and 'No' in promo and promo['No']:
+        lift = promo['Yes'] / promo['No'] - 1
+        lines.append(f"- Las promociones cambian las ventas medias un **{lift:+.1%}**.")
+    return "\n".join(lines)
+
+
+def make_claude_backend(model=MODEL):
+    """Backend que llama a la Messages API (system prompt cacheado)"""
+    import anthropic
+
+    client = anthropic.Anthropic()
+    system = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+    def insight_claude(stats):
+        message = client.messages.create(
+            model=model,
+            max_tokens=400,
+            system=system,
+            messages=[{"role": "user", "content": json.dumps(stats, ensure_ascii=False)}],
+        )
+        return "".join(block.text for block in message.content if block.type == "text")
+
+    return insight_claude
+
+
+# ==============================================
+# BATCH
+# ==============================================
+def run_batch(df, generate, concurrency=DEFAULT_CONCURRENCY):
+    """Genera los insights de todos los segmentos con concurrencia acotada"""
+    jobs = {}
+    for segment in enumerate_segments(df):
+        stats = segment_stats(df, segment)
+        if stats is not None:
+            jobs[segment_key(segment)] = stats
+
+    def work(item):
+        key, stats = item
+        try:
+            return key, generate(stats), None
+        except Exception as e:
+            return key, None, str(e)
+
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for key, text, error in pool.map(work, jobs.items()):
+            if error is None:
+                results[key] = text
+            else:
+                errors[key] = error
+    return results, errors
+
+
+def insights_path(version, directory=INSIGHTS_DIR):
+    return os.path.join(directory, f"{version}.json")
+
+
+def save_insights(version, results, backend, directory=INSIGHTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = insights_path(version, directory)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({
+            "dataset_version": version,
+            "backend": backend,
+            "generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "segments": results,
+        }, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)  # Escritura atómica
+    return path
+
+
+def load_insights(version, directory=INSIGHTS_DIR):
+    """Insights precalculados para una versión del dataset ({} si no hay)"""
+    try:
+        with open(insights_path(version, directory), encoding='utf-8') as f:
+            return json.load(f)["segments"]
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera insights de IA por segmento")
+    parser.add_argument('--data', default=None, help="Excel a usar (por defecto, el origen vigente)")
+    parser.add_argument('--backend', choices=['local', 'claude'], default='local')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--model', default=MODEL)
+    parser.add_argument('--out', default=INSIGHTS_DIR)
+    args = parser.parse_args()
+
+    df, version = load_shared_dataset(args.data)  # Ya tipado: solo se parsea si la versión es nueva
+    generate = insight_local if args.backend == 'local' else make_claude_backend(args.model)
+
+    start = time.perf_counter()
+    results, errors = run_batch(df, generate, args.concurrency)
+    path = save_insights(version, results, args.backend, args.out)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {len(results)} insights ({len(errors)} errores) en {elapsed:.1f}s → {path}")
+    for key, error in list(errors.items())[:5]:
+        print(f"   ❌ {key}: {error}")
+
+
+if __name__ == '__main__':
+    main()
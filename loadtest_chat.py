@@ -0,0 +1,166 @@
+# PRUEBA DE CARGA DEL CHAT CON CLAUDE
+# ==============================================
+# Sesiones de chat concurrentes contra el mock o la API: throughput y latencias.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso:
+#   python loadtest_chat.py --sessions 20 --turns 3
+#   python loadtest_chat.py --base-url http://127.0.0.1:8765 --no-stream
+
+import argparse
+import threading
+import time
+
+import anthropic
+
+from claude_chat import build_system, cache_hit_ratio, compact_history, new_usage_stats, record_usage, to_api_messages
+from claude_tools import AnalyticsTools, TOOL_DEFINITIONS, schema_summary
+from mock_anthropic import MockConfig, start_mock_server
+from zara_data import read_dataset
+
+MAX_TOOL_ROUNDS = 5
+QUESTIONS = [
+    "¿Cómo afectan las promociones a las ventas en productos WOMAN de Aisle?",
+    "¿Qué sección genera más revenue?",
+    "¿Qué posición en tienda funciona mejor?",
+    "Dame insights sobre la estrategia de precios",
+]
+
+
+def percentile(values, q):
+    """Percentil por interpolación lineal (q entre 0 y 100)"""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def chat_turn(client, history, system, tools, stream, usage):
+    """Un turno completo con bucle de herramientas. Devuelve (texto, ttft)"""
+    messages = to_api_messages(history)
+    start = time.perf_counter()
+    ttft = None
+    for _ in range(MAX_TOOL_ROUNDS):
+        kwargs = dict(model="claude-sonnet-4-20250514", max_tokens=1000,
+                      system=system, messages=messages, tools=TOOL_DEFINITIONS)
+        if stream:
+            with client.messages.stream(**kwargs) as events:
+                for event in events:
+                    if ttft is None and event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        ttft = time.perf_counter() - start
+                message = events.get_final_message()
+        else:
+            message = client.messages.create(**kwargs)
+        record_usage(usage, message.usage)
+        if message.stop_reason != "tool_use":
+            break
+        results = [
+            {"type": "tool_result", "tool_use_id": b.id, "content": tools.run(b.name, b.input)}
+            for b in message.content if b.type == "tool_use"
+        ]
+        messages.append({"role": "assistant", "content": [
+            {"type": "tool_use", "id": b.id, "name": b.name, "input": b.input}
+            for b in message.content if b.type == "tool_use"
+        ]})
+        messages.append({"role": "user", "content": results})
+    text = "".join(b.text for b in message.content if b.type == "text")
+    if ttft is None:
+        ttft = time.perf_counter() - start
+    return text, ttft
+
+
+def run_load_test(base_url, sessions, turns, stream=True, max_retries=0):
+    """Ejecuta las sesiones concurrentes y devuelve el informe"""
+    df = read_dataset()
+    tools = AnalyticsTools(df)
+    system = build_system(
+        "Eres un analista de datos experto trabajando con datos de productos de Zara.\n\n"
+        f"DATOS DISPONIBLES:\n{schema_summary(df)}"
+    )
+    latencies, ttfts, errors = [], [], []
+    usage = new_usage_stats()
+    lock = threading.Lock()
+    barrier = threading.Barrier(sessions)
+
+    def session(i):
+        client = anthropic.Anthropic(api_key="sk-ant-loadtest", base_url=base_url, max_retries=max_retries)
+        history, compaction, local_usage = [], {}, new_usage_stats()
+        barrier.wait()  # Todas las sesiones arrancan a la vez
+        for turn in range(turns):
+            history.append({"role": "user", "content": QUESTIONS[(i + turn) % len(QUESTIONS)]})
+            messages, _ = compact_history(history, compaction)
+            start = time.perf_counter()
+            try:
+                text, ttft = chat_turn(client, messages, system, tools, stream, local_usage)
+            except anthropic.APIError as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                history.pop()
+                continue
+            elapsed = time.perf_counter() - start
+            history.append({"role": "assistant", "content": text})
+            with lock:
+                latencies.append(elapsed)
+                ttfts.append(ttft)
+        with lock:
+            for key in local_usage:
+                usage[key] += local_usage[key]
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "sessions": sessions,
+        "turns_ok": len(latencies),
+        "errors": len(errors),
+        "wall_s": wall,
+        "throughput_turns_s": len(latencies) / wall if wall else 0.0,
+        "output_tokens_s": usage["output_tokens"] / wall if wall else 0.0,
+        "ttft_p50": percentile(ttfts, 50),
+        "ttft_p95": percentile(ttfts, 95),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "cache_hit_ratio": cache_hit_ratio(usage),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del chat con Claude")
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--turns', type=int, default=3)
+    parser.add_argument('--no-stream', dest='stream', action='store_false')
+    parser.add_argument('--base-url', help="Endpoint existente; si no se indica se arranca el mock local")
+    parser.add_argument('--max-retries', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.2, help="(mock) segundos hasta el primer token")
+    parser.add_argument('--tokens-per-sec', type=float, default=100.0, help="(mock) velocidad de tokens")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="(mock) fracción de errores")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if base_url is None:
+        config = MockConfig(args.latency, args.tokens_per_sec, args.error_rate)
+        _, base_url = start_mock_server(config=config)
+
+    report = run_load_test(base_url, args.sessions, args.turns, args.stream, args.max_retries)
+    print(f"📈 {report['sessions']} sesiones · {report['turns_ok']} turnos OK · {report['errors']} errores "
+          f"· {report['wall_s']:.2f}s")
+    print(f"   Throughput: {report['throughput_turns_s']:.2f} turnos/s · "
+          f"{report['output_tokens_s']:.0f} tokens de salida/s")
+    print(f"   TTFT:       p50 {report['ttft_p50'] * 1000:.0f} ms · p95 {report['ttft_p95'] * 1000:.0f} ms")
+    print(f"   Latencia:   p50 {report['latency_p50'] * 1000:.0f} ms · p95 {report['latency_p95'] * 1000:.0f} ms "
+          f"· p99 {report['latency_p99'] * 1000:.0f} ms")
+    print(f"   Prompt caching: {report['cache_hit_ratio']:.0%} de tokens de entrada desde caché")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+# PRUEBA DE CARGA DEL DASHBOARD (SESIONES CONCURRENTES)
+# ==============================================
+# Sesiones concurrentes del dashboard por websocket: latencias, CPU y RSS.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso:
+#   python loadtest_dashboard.py --sessions 1 5 10 25 50 --duration 30
+#   python loadtest_dashboard.py --url http://127.0.0.1:8501 --pid 12345
+#
+# CPU y RSS se leen de /proc (Linux); con --url sin --pid no se miden.
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.asyncio.client import connect
+
+from loadtest_chat import percentile
+
+DEFAULT_SCRIPT = 'dashboard_completo.py'
+DEFAULT_PORT = 8599
+THINK_TIME = (0.5, 2.0)  # Segundos de pausa entre acciones de un analista
+SAMPLE_INTERVAL = 0.5  # Segundos entre muestras de CPU/RSS del servidor
+SATURATED_CORES = 0.85  # CPU a partir de la que un proceso (limitado por el GIL) está saturado
+SEARCHES = ['jacket', 'puffer', 'leather', 'zip pocket', 'dress', 'shirt']
+WIDGET_TYPES = ('slider', 'multiselect', 'checkbox', 'text_input', 'radio', 'button')
+_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+# ==============================================
+# SESIÓN (PROTOCOLO DEL FRONTEND)
+# ==============================================
+class DashboardSession:
+    """Una pestaña del navegador que envía reruns y espera al fin del script"""
+
+    def __init__(self, url):
+        self.url = url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+        self.ws = None
+        self.widgets = {}  # etiqueta → (proto, fragmento que lo contiene) del último run
+        self.states = {}  # id → WidgetState enviado en cada rerun
+        self.auto_rerun = None  # (intervalo, fragment_id) pendiente
+        self.latencies = []  # Segundos de cada rerun (petición → fin del script)
+        self.errors = 0
+
+    async def open(self):
+        self.ws = await connect(self.url, subprotocols=['streamlit'], max_size=None)
+        await self.settle()
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _rerun(self, fragment_id='', auto=False):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.is_auto_rerun = auto
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        if not fragment_id:
+            self.auto_rerun = None  # Un run completo cancela los temporizadores del anterior
+        widgets = {}
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'auto_rerun':
+                self.auto_rerun = (forward.auto_rerun.interval, forward.auto_rerun.fragment_id)
+            elif kind == 'stop_auto_rerun':
+                self.auto_rerun = None
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                widget = element.WhichOneof('type')
+                if widget == 'exception':
+                    self.errors += 1
+                elif widget in WIDGET_TYPES:
+                    proto = getattr(element, widget)
+                    widgets[proto.label] = (proto, forward.delta.fragment_id)
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # st.rerun(): el servidor relanza el script completo sin nueva petición
+                    fragment_id, widgets = '', {}
+                    self.auto_rerun = None
+                    continue
+                break
+        self.latencies.append(time.perf_counter() - start)
+        if not fragment_id:
+            self.widgets = widgets
+        else:
+            self.widgets.update(widgets)
+
+    async def settle(self, fragment_id=''):
+        """Un rerun y, mientras haya un fragmento con run_every pendiente, sus relanzamientos"""
+        await self._rerun(fragment_id)
+        while self.auto_rerun is not None:
+            interval, fragment = self.auto_rerun
+            await asyncio.sleep(interval)
+            await self._rerun(fragment, auto=True)
+
+    # ------------------------------------------
+    # Acciones sobre widgets (por etiqueta)
+    # ------------------------------------------
+    # Un widget dentro de un st.fragment solo reejecuta ese fragmento, como en el navegador
+    def _state(self, label):
+        proto, fragment_id = self.widgets[label]
+        state = self.states.setdefault(proto.id, WidgetState(id=proto.id))
+        return proto, state, fragment_id
+
+    async def set_slider(self, label, low, high):
+        _, state, fragment_id = self._state(label)
+        state.ClearField('double_array_value')
+        state.double_array_value.data.extend([low, high])
+        await self.settle(fragment_id)
+
+    async def set_multiselect(self, label, values):
+        proto, state, fragment_id = self._state(label)
+        state.ClearField('string_array_value')
+        state.ClearField('int_array_value')
+        if 'raw_values' in type(proto).DESCRIPTOR.fields_by_name:
+            state.string_array_value.data.extend(values)
+        else:  # Versiones que identifican las opciones por índice
+            state.int_array_value.data.extend(list(proto.options).index(v) for v in values)
+        await self.settle(fragment_id)
+
+    async def set_toggle(self, label, value):
+        _, state, fragment_id = self._state(label)
+        state.bool_value = value
+        await self.settle(fragment_id)
+
+    async def set_text(self, label, value):
+        _, state, fragment_id = self._state(label)
+        state.string_value = value
+        await self.settle(fragment_id)
+
+    async def set_radio(self, label, value):
+        proto, state, fragment_id = self._state(label)
+        if 'raw_value' in type(proto).DESCRIPTOR.fields_by_name:
+            state.string_value = value
+        else:
+            state.int_value = list(proto.options).index(value)
+        await self.settle(fragment_id)
+
+    def options(self, label):
+        return list(self.widgets[label][0].options)
+
+    def slider_range(self, label):
+        proto = self.widgets[label][0]
+        return proto.min, proto.max
+
+
+# ==============================================
+# GUION DE ANALISTA
+# ==============================================
+async def analyst_step(session, rng):
+    """Una acción al azar con el peso aproximado de un uso real (los filtros dominan)"""
+    action = rng.choices(['price', 'section', 'search', 'exact', 'grain', 'clear'],
+                         weights=[40, 20, 15, 10, 10, 5])[0]
+    if action in ('exact', 'grain') and not {"🎯 Estadísticas exactas", "Granularidad"} <= set(session.widgets):
+        action = 'section'  # Vista prerenderizada: esos widgets llegan con el primer cambio de filtro
+    if action == 'price':
+        low, high = session.slider_range("💰 Rango de Precio (€)")
+        a, b = sorted(rng.uniform(low, high) for _ in range(2))
+        await session.set_slider("💰 Rango de Precio (€)", round(a, 2), round(b, 2))
+    elif action == 'section':
+        options = session.options("📊 Sección")
+        await session.set_multiselect("📊 Sección", rng.sample(options, rng.randint(1, len(options))))
+    elif action == 'search':
+        await session.set_text("🔎 Buscar producto", rng.choice(SEARCHES))
+    elif action == 'exact':
+        await session.set_toggle("🎯 Estadísticas exactas", rng.random() < 0.5)
+    elif action == 'grain':
+        await session.set_radio("Granularidad", rng.choice(session.options("Granularidad")))
+    else:
+        session.states.clear()  # Como "Resetear": vuelta a los valores por defecto
+        await session.settle()
+    return action
+
+
+async def run_session(url, deadline, seed, think=THINK_TIME):
+    """Abre una sesión y repite acciones hasta `deadline`; devuelve la sesión con sus medidas"""
+    rng = random.Random(seed)
+    session = DashboardSession(url)
+    try:
+        await session.open()
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(rng.uniform(*think))
+            await analyst_step(session, rng)
+    except Exception:  # Conexión cerrada o widget ausente: cuenta como error de la sesión
+        session.errors += 1
+    finally:
+        await session.close()
+    return session
+
+
+# ==============================================
+# SERVIDOR Y MEDIDAS DE PROCESO
+# ==============================================
+def proc_sample(pid):
+    """(segundos de CPU, RSS en bytes) de un proceso leyendo /proc"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / _TICKS  # utime + stime
+    with open(f'/proc/{pid}/status') as f:
+        rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+    return cpu, rss
+
+
+def start_server(script, port):
+    """Lanza `streamlit run` en segundo plano y espera a que responda el health check"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', script, '--server.headless', 'true',
+         '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(120):
+        try:
+            with urllib.request.urlopen(f'{url}/_stcore/health', timeout=1):
+                return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("El servidor de Streamlit no arrancó")
+
+
+async def run_level(url, sessions, duration, pid=None, think=THINK_TIME):
+    """N sesiones a la vez durante `duration` segundos; devuelve el informe del nivel"""
+    samples = []
+
+    async def sample():
+        while True:
+            samples.append(proc_sample(pid))
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    sampler = asyncio.create_task(sample()) if pid else None
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        run_session(url, start + duration, seed=i, think=think) for i in range(sessions)
+    ))
+    wall = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+        samples.append(proc_sample(pid))
+
+    latencies = [latency for session in results for latency in session.latencies]
+    report = {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "errors": sum(session.errors for session in results),
+        "wall_s": wall,
+        "reruns_s": len(latencies) / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "cpu_cores": None,
+        "rss_mb": None,
+    }
+    if len(samples) >= 2:
+        report["cpu_cores"] = (samples[-1][0] - samples[0][0]) / wall
+        report["rss_mb"] = max(rss for _, rss in samples) / 1e6
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del dashboard con sesiones concurrentes")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10, 25, 50])
+    parser.add_argument('--duration', type=float, default=30.0, help="Segundos por nivel de carga")
+    parser.add_argument('--think', type=float, nargs=2, default=THINK_TIME, help="Pausa mínima y máxima (s)")
+    parser.add_argument('--slo', type=float, default=1000.0, help="p95 aceptable en ms")
+    parser.add_argument('--script', default=DEFAULT_SCRIPT)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--url', help="Servidor ya arrancado; si no se indica se lanza uno")
+    parser.add_argument('--pid', type=int, help="(con --url) PID del servidor para medir CPU y RSS")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        process, url = start_server(args.script, args.port)
+        pid = process.pid
+    try:
+        # Calentar cachés y el dataset: el primer nivel no debe medir el arranque en frío
+        asyncio.run(run_level(url, 1, 0.0, think=(0.0, 0.0)))
+        baseline_mb = proc_sample(pid)[1] / 1e6 if pid else None
+        print(f"{'sesiones':>8} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'CPU núcleos':>11} {'RSS MB':>8} {'MB/sesión':>10} {'errores':>8}")
+        capacity, peak_cpu, failed = None, 0.0, False
+        for sessions in args.sessions:
+            report = asyncio.run(run_level(url, sessions, args.duration, pid, tuple(args.think)))
+            if report['cpu_cores'] is not None:
+                # RSS que añade cada sesión (estado, copias de DataFrames por sesión...)
+                per_session = (report['rss_mb'] - baseline_mb) / sessions
+                measured = f"{report['cpu_cores']:11.2f} {report['rss_mb']:8.0f} {per_session:10.2f}"
+                peak_cpu = max(peak_cpu, report['cpu_cores'])
+            else:
+                measured = f"{'-':>11} {'-':>8} {'-':>10}"
+            print(f"{sessions:8} {report['reruns_s']:9.1f} {report['p50'] * 1000:8.0f} "
+                  f"{report['p95'] * 1000:8.0f} {report['p99'] * 1000:8.0f} {measured} {report['errors']:8}")
+            if report['p95'] * 1000 > args.slo or report['errors']:
+                # La capacidad es el último nivel que cumple antes del primero que falla
+                print(f"   Nivel de {sessions} sesiones fuera del SLO: se detiene la prueba")
+                failed = True
+                break
+            capacity = report
+        if capacity is None:
+            print(f"⚠️ Ningún nivel cumple p95 ≤ {args.slo:.0f} ms")
+        else:
+            print(f"✅ Hasta {capacity['sessions']} sesiones con p95 ≤ {args.slo:.0f} ms")
+            if capacity['cpu_cores']:
+                print(f"   ≈ {capacity['sessions'] / capacity['cpu_cores']:.1f} sesiones por núcleo "
+                      f"({capacity['cpu_cores']:.2f} núcleos medidos en ese nivel)")
+        if peak_cpu >= SATURATED_CORES:
+            # Los reruns comparten el GIL: un proceso no pasa de ~1 núcleo, se escala con réplicas
+            print(f"   Saturado a {peak_cpu:.2f} núcleos: más sesiones solo alargan la cola "
+                  f"(un proceso por núcleo)")
+        elif peak_cpu and not failed:
+            print(f"   Sin saturar (máximo {peak_cpu:.2f} núcleos): prueba con más sesiones")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# SERVIDOR LOCAL QUE IMITA LA MESSAGES API DE ANTHROPIC
+# ==============================================
+# Imita POST /v1/messages con latencia y errores configurables.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso:
+#   python mock_anthropic.py --port 8765 --latency 0.3 --tokens-per-sec 80
+#   ANTHROPIC_BASE_URL=http://127.0.0.1:8765 streamlit run notebook4_claude_ai.py
+#
+# El SDK de anthropic lee ANTHROPIC_BASE_URL, así que el chat, el job de
+# insights y loadtest_chat.py apuntan al mock sin cambiar código.
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Según los datos, la sección WOMAN concentra la mayor parte del revenue "
+    "y los productos en End-cap venden más unidades de media que los de Aisle."
+)
+
+
+class MockConfig:
+    """Parámetros del mock (modificables en caliente desde los tests)"""
+
+    def __init__(self, latency=0.2, tokens_per_sec=100.0, error_rate=0.0,
+                 error_status=529, reply=DEFAULT_REPLY, seed=None):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.reply = reply
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "streams": 0}
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+
+    def usage_for(self, body):
+        """Uso de tokens simulado, incluida la caché de prompt"""
+        system = body.get("system", "")
+        cached_blocks = [b for b in system if isinstance(b, dict) and b.get("cache_control")] \
+            if isinstance(system, list) else []
+        prompt_tokens = len(json.dumps(body, ensure_ascii=False)) // 4
+        if not cached_blocks:
+            return {"input_tokens": prompt_tokens, "cache_read_input_tokens": 0,
+                    "cache_creation_input_tokens": 0}
+        prefix = json.dumps([body.get("tools"), cached_blocks], sort_keys=True)
+        prefix_tokens = min(len(prefix) // 4, prompt_tokens)
+        with self._lock:
+            hit = prefix in self._cached_prefixes
+            self._cached_prefixes.add(prefix)
+        return {
+            "input_tokens": prompt_tokens - prefix_tokens,
+            "cache_read_input_tokens": prefix_tokens if hit else 0,
+            "cache_creation_input_tokens": 0 if hit else prefix_tokens,
+        }
+
+
+def _tool_call_for(body):
+    """Llamada a la primera herramienta ofrecida si aún no hay resultados"""
+    tools = body.get("tools") or []
+    last = (body.get("messages") or [{}])[-1]
+    content = last.get("content")
+    answered = isinstance(content, list) and any(
+        isinstance(b, dict) and b.get("type") == "tool_result" for b in content
+    )
+    if not tools or answered:
+        return None
+    tool = tools[0]
+    schema = tool.get("input_schema", {})
+    args = {}
+    for name in schema.get("required", []):
+        prop = schema.get("properties", {}).get(name, {})
+        if prop.get("type") == "array":
+            args[name] = [prop.get("items", {}).get("enum", ["x"])[0]]
+        elif "enum" in prop:
+            args[name] = prop["enum"][0]
+        elif prop.get("type") in ("integer", "number"):
+            args[name] = prop.get("minimum", 1)
+        else:
+            args[name] = "x"
+    return {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:20]}", "name": tool["name"], "input": args}
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass  # Silencioso: el harness mide por su cuenta
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _sse(self, event, payload):
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/v1/messages":
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with config._lock:
+                config.stats["requests"] += 1
+                fail = config.random.random() < config.error_rate
+                if fail:
+                    config.stats["errors"] += 1
+            time.sleep(config.latency)
+            if fail:
+                self._send_json(config.error_status, {
+                    "type": "error", "error": {"type": "overloaded_error", "message": "Mock: error inyectado"}
+                })
+                return
+
+            tool_call = _tool_call_for(body)
+            words = config.reply.split(" ")
+            usage = config.usage_for(body)
+            usage["output_tokens"] = 20 if tool_call else len(words)
+            message = {
+                "id": f"msg_{uuid.uuid4().hex[:24]}",
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model", "mock"),
+                "content": [tool_call] if tool_call else [{"type": "text", "text": config.reply}],
+                "stop_reason": "tool_use" if tool_call else "end_turn",
+                "stop_sequence": None,
+                "usage": usage,
+            }
+            if not body.get("stream"):
+                if not tool_call:
+                    time.sleep(len(words) / config.tokens_per_sec)
+                self._send_json(200, message)
+                return
+
+            with config._lock:
+                config.stats["streams"] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            start = dict(message, content=[], stop_reason=None,
+                         usage=dict(usage, output_tokens=1))
+            self._sse("message_start", {"type": "message_start", "message": start})
+            if tool_call:
+                self._sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                                  "content_block": dict(tool_call, input={})})
+                self._sse("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {
+                    "type": "input_json_delta", "partial_json": json.dumps(tool_call["input"])}})
+            else:
+                self._sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                                  "content_block": {"type": "text", "text": ""}})
+                for i, word in enumerate(words):
+                    time.sleep(1 / config.tokens_per_sec)
+                    self._sse("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {
+                        "type": "text_delta", "text": word if i == 0 else " " + word}})
+            self._sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+            self._sse("message_delta", {"type": "message_delta",
+                                        "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                                        "usage": {"output_tokens": usage["output_tokens"]}})
+            self._sse("message_stop", {"type": "message_stop"})
+
+    return Handler
+
+
+def start_mock_server(host="127.0.0.1", port=0, config=None):
+    """Arranca el mock en un hilo. Devuelve (servidor, base_url)"""
+    config = config or MockConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock local de la Messages API de Anthropic")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help="Segundos hasta el primer token")
+    parser.add_argument('--tokens-per-sec', type=float, default=100.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fracción de peticiones que fallan")
+    parser.add_argument('--error-status', type=int, default=529)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.tokens_per_sec, args.error_rate, args.error_status)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f"🧪 Mock de Anthropic en http://{args.host}:{args.port}/v1/messages")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,6 @@ PASO 1: Importar librerías necesarias
 """
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 
 # Configuración de la página
 st.set_page_config(
@@ -80,6 +79,7 @@ EJERCICIO PARA LOS ESTUDIANTES:
 4. Añade un gráfico de barras simple mostrando ventas por sección
 
 HINT: Para el gráfico usa:
+import plotly.express as px  # Impórtalo justo donde lo necesites
 fig = px.bar(df.groupby('section')['Sales Volume'].sum().reset_index(), 
              x='section', y='Sales Volume')
 st.plotly_chart(fig)
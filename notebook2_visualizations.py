@@ -5,23 +5,24 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+from shared_dataset import load_shared_dataset
 
 st.set_page_config(page_title="Zara Analytics", layout="wide")
 
-# Cargar datos
+# Cargar datos: el mismo dataset tipado que el dashboard (precio en la divisa base)
 @st.cache_data
 def load_data():
-    df = pd.read_excel('EADIC_claude_test.xlsx', sheet_name='raw_zara')
-    df['price'] = pd.to_numeric(df['price'], errors='coerce')
-    df['Revenue'] = df['price'] * df['Sales Volume']
+    df, _ = load_shared_dataset()
     return df
 
 df = load_data()
 
 st.title("📊 Visualizaciones Interactivas")
 
+# Importación diferida: el título se pinta antes de cargar plotly
+import plotly.express as px
+
 """
 ===========================================
 SECCIÓN 1: Gráfico de Barras - Ventas por Posición
@@ -82,7 +83,7 @@ SECCIÓN 3: Scatter Plot - Precio vs Ventas
 st.subheader("Relación Precio vs Volumen de Ventas")
 
 fig3 = px.scatter(
-    df,
+    df.dropna(subset=['Revenue']),  # Las filas en cuarentena no tienen precio
     x='price',
     y='Sales Volume',
     color='section',
@@ -140,13 +141,48 @@ fig5 = px.bar(
 
 st.plotly_chart(fig5, use_container_width=True)
 
+"""
+===========================================
+SECCIÓN 6: Histograma de Precios (bins precalculados)
+===========================================
+"""
+st.subheader("Distribución de Precios")
+
+from quantile_sketch import SketchCube
+
+# Los conteos por bin se calculan una vez por celda (sección × posición ×
+# promoción × temporada); un filtro solo suma las celdas que selecciona
+@st.cache_resource
+def get_sketches():
+    return SketchCube(load_data())
+
+sketches = get_sketches()
+all_cells = sketches.cells([list(sketches.values[dim]) for dim in sketches.dimensions])
+price_bins = sketches.histogram(all_cells)
+price_bins['tramo'] = [f"€{lo:.0f}-{hi:.0f}" for lo, hi in zip(price_bins['desde'], price_bins['hasta'])]
+
+fig6 = px.bar(
+    price_bins,
+    x='tramo',
+    y='productos',
+    title="Productos por Tramo de Precio",
+    color_discrete_sequence=['#000000']
+)
+
+fig6.update_layout(height=400, bargap=0.05, xaxis_title="Precio", yaxis_title="Productos")
+
+st.plotly_chart(fig6, use_container_width=True)
+
+mediana = sketches.sketch('price', all_cells).quantile(0.5)
+st.caption(f"Precio mediano ≈ €{mediana:.2f} (sketch con error relativo ≤ {sketches.accuracy:.0%})")
+
 """
 ========================================
 EJERCICIO PARA LOS ESTUDIANTES:
 ========================================
 
-1. Crea un histograma de la distribución de precios
-   HINT: usa px.histogram(df, x='price')
+1. Compara el histograma de la sección 6 con el de plotly sobre todas las filas
+   HINT: usa px.histogram(df, x='price', nbins=20)
 
 2. Añade un box plot comparando ventas entre secciones
    HINT: usa px.box(df, x='section', y='Sales Volume')
@@ -5,7 +5,6 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 
 st.set_page_config(page_title="Zara Analytics", layout="wide")
 
@@ -114,6 +113,9 @@ st.markdown("---")
 SECCIÓN 4: Visualizaciones que se Actualizan
 ===========================================
 """
+# Importación diferida: filtros y KPIs se pintan antes de cargar plotly
+import plotly.express as px
+
 col1, col2 = st.columns(2)
 
 with col1:
@@ -193,6 +195,8 @@ EJERCICIO PARA LOS ESTUDIANTES:
 
 1. Añade un filtro de búsqueda por nombre de producto
    HINT: usa st.sidebar.text_input() y df[df['name'].str.contains()]
+   (con catálogos grandes, mira cómo lo resuelve el dashboard completo
+   con el índice de trigramas de text_search.py)
 
 2. Crea un filtro de tipo selectbox (uno solo) para Product Category
    HINT: usa st.sidebar.selectbox()
@@ -6,14 +6,16 @@
 import streamlit as st
 import pandas as pd
 
+from shared_dataset import load_shared_dataset
+
+MAX_TOOL_ROUNDS = 5  # Máximo de rondas de herramientas por pregunta
+
 st.set_page_config(page_title="Zara Analytics + AI", layout="wide")
 
-# Cargar datos
+# Cargar datos: el mismo dataset tipado que el dashboard (precio en la divisa base)
 @st.cache_data
 def load_data():
-    df = pd.read_excel('EADIC_claude_test.xlsx', sheet_name='raw_zara')
-    df['price'] = pd.to_numeric(df['price'], errors='coerce')
-    df['Revenue'] = df['price'] * df['Sales Volume']
+    df, _ = load_shared_dataset()
     return df
 
 df = load_data()
@@ -65,14 +67,27 @@ if not user_api_key:
     
     st.stop()  # Detiene la ejecución si no hay key
 
+# Las dependencias de IA solo se cargan cuando ya hay una API key
+from claude_chat import (
+    build_system, cache_hit_ratio, compact_history, merge_usage, new_usage_stats, record_usage,
+    to_api_messages, without_failed
+)
+from claude_gateway import ClaudeGateway, RateLimitExceeded, request_key
+from claude_tools import AnalyticsTools, TOOL_DEFINITIONS, schema_summary
+
 """
 ===========================================
 SECCIÓN 2: Función para Llamar a Claude
 ===========================================
 """
-def call_claude_api(prompt, data_context, api_key):
+def call_claude_api(history, data_context, api_key, tools=None, trace=None, usage=None):
     """
-    Llama a la API de Claude con el contexto de los datos
+    Llama a la API de Claude con el historial de la conversación y el
+    contexto de los datos (system prompt marcado para prompt caching).
+    Si se pasan `tools`, Claude puede pedir agregados locales
+    (group_by, top_n, price_histogram) antes de responder; cada
+    ejecución se anota en `trace` y el consumo de tokens en `usage`.
+    Devuelve (texto, fallida): una respuesta fallida no vuelve a la API.
     """
     try:
         import anthropic
@@ -86,37 +101,77 @@ DATOS DISPONIBLES:
 
 Responde de forma clara, concisa y profesional. Usa números y datos específicos."""
         
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1000,
-            messages=[{"role": "user", "content": prompt}],
-            system=system_prompt
-        )
+        messages = to_api_messages(history)
+        extra = {"tools": TOOL_DEFINITIONS} if tools is not None else {}
+        
+        # Bucle de tool use: ejecutar herramientas hasta obtener la respuesta final
+        for round_number in range(MAX_TOOL_ROUNDS + 1):
+            message = client.messages.create(
+                model="claude-sonnet-4-20250514",
+                max_tokens=1000,
+                messages=messages,
+                system=build_system(system_prompt),
+                **extra
+            )
+            if usage is not None:
+                record_usage(usage, message.usage)
+            
+            if message.stop_reason != "tool_use":
+                break
+            if round_number == MAX_TOOL_ROUNDS:
+                # Claude sigue pidiendo herramientas: mejor decirlo que devolver una respuesta a medias
+                return (f"⚠️ Claude necesitó más de {MAX_TOOL_ROUNDS} rondas de herramientas sin llegar "
+                        "a una respuesta. Prueba con una pregunta más concreta."), True
+            
+            assistant_content = []
+            tool_results = []
+            for block in message.content:
+                if block.type == "text":
+                    assistant_content.append({"type": "text", "text": block.text})
+                elif block.type == "tool_use":
+                    assistant_content.append({
+                        "type": "tool_use", "id": block.id, "name": block.name, "input": block.input
+                    })
+                    tool_results.append({
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": tools.run(block.name, block.input, trace)
+                    })
+            messages.append({"role": "assistant", "content": assistant_content})
+            messages.append({"role": "user", "content": tool_results})
         
-        return message.content[0].text
+        return "".join(block.text for block in message.content if block.type == "text"), False
     
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        return f"❌ Error: {str(e)}", True
 
 """
 ===========================================
 SECCIÓN 3: Preparar Contexto de Datos
 ===========================================
 """
-# Resumen de los datos para enviar a Claude
-data_summary = f"""
-Dataset de Productos Zara:
-- Total productos: {len(df)}
-- Secciones: {', '.join(df['section'].unique())}
-- Posiciones: {', '.join(df['Product Position'].unique())}
-- Rango de precios: €{df['price'].min():.2f} - €{df['price'].max():.2f}
-- Precio promedio: €{df['price'].mean():.2f}
-- Total ventas (unidades): {df['Sales Volume'].sum():,}
-- Revenue total: €{df['Revenue'].sum():,.0f}
+# Contexto de tamaño constante: solo esquema y valores de las dimensiones.
+# Las cifras concretas las pide Claude a través de las herramientas.
+@st.cache_data
+def get_data_summary():
+    """Se calcula una vez por versión de los datos, no en cada mensaje"""
+    return schema_summary(load_data())
 
-Top 5 productos por revenue:
-{df.nlargest(5, 'Revenue')[['name', 'price', 'Sales Volume', 'Revenue']].to_string()}
-"""
+data_summary = get_data_summary()
+
+@st.cache_resource
+def get_analytics_tools():
+    """Herramientas compartidas entre reruns (mantiene la caché de resultados)"""
+    return AnalyticsTools(load_data())
+
+analytics_tools = get_analytics_tools()
+
+@st.cache_resource
+def get_gateway():
+    """Gateway único por proceso: coalescencia + rate limit por API key"""
+    return ClaudeGateway()
+
+gateway = get_gateway()
 
 """
 ===========================================
@@ -128,56 +183,133 @@ st.success("✅ **Chat con Claude activado**")
 # Inicializar historial de chat en session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "usage_stats" not in st.session_state:
+    st.session_state.usage_stats = new_usage_stats()
+if "compaction" not in st.session_state:
+    st.session_state.compaction = {}  # Resumen del historial antiguo, reutilizado entre turnos
 
-# Mostrar historial
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
-
-# Input del usuario
-if prompt := st.chat_input("Pregunta sobre los datos de Zara..."):
-    # Añadir mensaje del usuario
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.chat_message("user"):
-        st.markdown(prompt)
-    
-    # Obtener respuesta de Claude
-    with st.chat_message("assistant"):
-        with st.spinner("Claude está analizando..."):
-            response = call_claude_api(prompt, data_summary, user_api_key)
-            st.markdown(response)
-    
-    # Añadir respuesta al historial
-    st.session_state.messages.append({"role": "assistant", "content": response})
+@st.fragment
+def chat_panel(data_summary):
+    """
+    Historial, input y estadísticas del chat. Enviar un mensaje solo
+    reejecuta este fragmento: los datos y su resumen no se recalculan.
+    """
+    # Mostrar historial
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
-# Botón para limpiar conversación
-if st.button("🗑️ Limpiar Chat"):
-    st.session_state.messages = []
-    st.rerun()
+    # Input del usuario (o pregunta sugerida pulsada en la sección 5)
+    prompt = st.chat_input("Pregunta sobre los datos de Zara...") or st.session_state.pop("pending_prompt", None)
+    if prompt:
+        # Añadir mensaje del usuario
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.markdown(prompt)
+        
+        # Obtener respuesta de Claude
+        with st.chat_message("assistant"):
+            backpressure = st.empty()
+            with st.spinner("Claude está analizando..."):
+                stats = st.session_state.usage_stats
+                history, compacted = compact_history(
+                    without_failed(st.session_state.messages), st.session_state.compaction
+                )
+                stats["compactions"] += compacted
+                
+                def upstream():
+                    tool_calls, turn_usage = [], new_usage_stats()
+                    text, failed = call_claude_api(
+                        history, data_summary, user_api_key,
+                        tools=analytics_tools, trace=tool_calls, usage=turn_usage
+                    )
+                    return text, failed, tool_calls, turn_usage
+                
+                # Sesiones con la misma pregunta en vuelo comparten una sola llamada
+                try:
+                    (response, failed, tool_calls, turn_usage), shared = gateway.call(
+                        user_api_key,
+                        request_key(user_api_key, history, data_summary),
+                        upstream,
+                        on_wait=lambda wait: backpressure.info(
+                            f"⏳ Muchas peticiones simultáneas: tu pregunta está en cola (~{wait:.0f}s)"
+                        )
+                    )
+                except RateLimitExceeded as e:
+                    response = f"⚠️ Límite de peticiones alcanzado ({e}). Inténtalo en unos segundos."
+                    failed, tool_calls, turn_usage, shared = True, [], new_usage_stats(), False
+                backpressure.empty()
+                
+                # Solo se contabilizan los tokens de llamadas propias
+                if not shared:
+                    merge_usage(stats, turn_usage)
+                stats["turns"] += 1
+                st.markdown(response)
+                if shared:
+                    st.caption("🔁 Respuesta compartida con otra sesión que hizo la misma pregunta")
+                
+                if tool_calls:
+                    with st.expander(f"🔧 Herramientas usadas ({len(tool_calls)})"):
+                        for call in tool_calls:
+                            origen = "caché" if call["cached"] else f"{call['ms']:.1f} ms"
+                            st.caption(f"`{call['tool']}` · {origen} · {call['input']}")
+        
+        # Añadir respuesta al historial (los errores se muestran, pero no se envían a la API)
+        reply = {"role": "assistant", "content": response}
+        if failed:
+            reply["error"] = True
+        st.session_state.messages.append(reply)
+
+    # Estadísticas de prompt caching de esta sesión
+    stats = st.session_state.usage_stats
+    if stats["turns"]:
+        st.caption(
+            f"🧠 Prompt caching: {cache_hit_ratio(stats):.0%} de tokens de entrada desde caché · "
+            f"lecturas {stats['cache_read_input_tokens']:,} · escrituras {stats['cache_creation_input_tokens']:,} · "
+            f"sin caché {stats['input_tokens']:,} · {stats['turns']} turnos · {stats['compactions']} compactaciones"
+        )
+        st.caption(
+            f"🔁 Gateway (todas las sesiones): {gateway.stats['requests']} peticiones · "
+            f"{gateway.stats['upstream']} llamadas a la API · {gateway.stats['coalesced']} compartidas · "
+            f"{gateway.stats['queued']} en cola · {gateway.stats['rejected']} rechazadas · "
+            f"{gateway.stats['timeouts']} sin esperar al líder"
+        )
+
+    # Botón para limpiar conversación
+    if st.button("🗑️ Limpiar Chat"):
+        st.session_state.messages = []
+        st.session_state.usage_stats = new_usage_stats()
+        st.session_state.compaction = {}
+        st.rerun(scope="fragment")
+
+chat_panel(data_summary)
 
 """
 ===========================================
 SECCIÓN 5: Sugerencias de Preguntas
 ===========================================
 """
+SUGGESTED_QUESTIONS = {
+    "**Análisis de Ventas:**": [
+        "¿Qué productos tienen mejor rendimiento?",
+        "¿Cómo afectan las promociones a las ventas?",
+        "¿Qué sección genera más revenue?",
+    ],
+    "**Estrategia:**": [
+        "¿Qué productos deberíamos promocionar más?",
+        "Dame insights sobre la estrategia de precios",
+        "¿Qué posición en tienda funciona mejor?",
+    ],
+}
+
 with st.expander("💡 Preguntas Sugeridas"):
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("""
-        **Análisis de Ventas:**
-        - ¿Qué productos tienen mejor rendimiento?
-        - ¿Cómo afectan las promociones a las ventas?
-        - ¿Qué sección genera más revenue?
-        """)
-    
-    with col2:
-        st.markdown("""
-        **Estrategia:**
-        - ¿Qué productos deberíamos promocionar más?
-        - Dame insights sobre la estrategia de precios
-        - ¿Qué posición en tienda funciona mejor?
-        """)
+    for col, (titulo, preguntas) in zip(st.columns(2), SUGGESTED_QUESTIONS.items()):
+        with col:
+            st.markdown(titulo)
+            for pregunta in preguntas:
+                if st.button(pregunta, key=f"sugerida_{pregunta}"):
+                    st.session_state.pending_prompt = pregunta
+                    st.rerun()
 
 """
 ===========================================
@@ -37,11 +37,14 @@ venv/
 """
 Tu requirements.txt debe tener:
 
-streamlit==1.31.0
+streamlit==1.43.0
 pandas==2.2.0
 plotly==5.18.0
 openpyxl==3.1.2
-anthropic==0.18.1
+anthropic==0.49.0
+pyarrow==15.0.0
+numpy==1.26.3
+websockets==15.0.1
 """
 
 """
@@ -257,6 +260,72 @@ if not check_password():
     st.stop()
 """
 
+# 8.3: Varias réplicas / procesos
+"""
+Si despliegas varias réplicas en el mismo host, publica el dataset una
+sola vez como fichero Arrow antes de arrancarlas:
+
+python shared_dataset.py
+
+Cada proceso mapea ese fichero en solo lectura (sin parsear el Excel ni
+copiar los datos), así que añadir procesos apenas añade memoria.
+Con ZARA_DATA_DIR puedes elegir la carpeta compartida.
+
+Las columnas de texto largo (name, description, url, sku, terms) van
+codificadas como diccionario: cada texto distinto se guarda una vez y
+en memoria solo queda un código por fila. El comando anterior imprime
+cuánto ocupan las columnas analíticas frente al texto.
+
+Si recibes un libro por mercado y día, ingiérelos todos de una vez:
+
+python ingest_workbooks.py scrapes/ --workers 8
+
+Cada libro se parsea en un proceso distinto (un núcleo por libro),
+se normaliza al esquema común y la unión se publica en el mismo
+formato Arrow. Los ficheros corruptos se listan y se saltan. El
+manifiesto de la ingesta (.zara_cache/ingest_manifest.json) pasa a ser
+el origen de datos: el refresco del dashboard recoge la nueva unión sin
+reiniciar, y el warm-up y los jobs la leen en lugar del Excel.
+
+El precio se parsea una sola vez al ingerir (acepta "19.99", "19,99 €",
+"1.299,00"...) y se convierte a la divisa base (ZARA_BASE_CURRENCY, EUR
+por defecto) con la tabla local fx_rates.csv. Las filas con precio
+inválido, o que Excel convirtió en fecha (ambiguas: "5.05" y "5.5" dan
+la misma), quedan sin precio y se listan con su motivo en
+.zara_cache/quarantine/<libro>-<hoja>.csv. Si actualizas fx_rates.csv
+(o cambia el parser), la versión del dataset cambia y se vuelve a
+publicar; el refresco lo detecta sin reiniciar y, si el origen es una
+ingesta, vuelve a ingerir sus libros.
+"""
+
+# 8.4: Warm-up antes de recibir tráfico
+"""
+En lugar de `streamlit run app.py`, arranca con:
+
+python warmup.py --serve
+
+Precalcula el dataset, la vista por defecto y los filtros más usados
+y expone GET :8502/ready (200 cuando está caliente y Streamlit responde,
+503 mientras tanto). Usa esa URL como health check del balanceador.
+
+El warm-up también prerenderiza la vista por defecto (KPIs, gráficos y
+top 20) en .zara_cache/default_view-<versión>.json; sin --serve, o con
+`python static_view.py`, sirve como paso de build. Cada visitante nuevo
+la recibe al instante y el dashboard interactivo se carga cuando
+cambia un filtro.
+"""
+
+# 8.5: ¿Cuántas sesiones aguanta cada réplica?
+"""
+Antes de decidir cuántas réplicas desplegar, mide la saturación:
+
+python loadtest_dashboard.py --sessions 1 5 10 25 50 --duration 30
+
+Simula analistas moviendo filtros a la vez sobre un servidor y muestra
+reruns/s, latencias p95/p99, CPU y RSS por nivel. Un proceso de
+Streamlit no pasa de ~1 núcleo: para más sesiones, más réplicas.
+"""
+
 """
 ========================================
 CHECKLIST FINAL DE DEPLOYMENT
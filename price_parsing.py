@@ -0,0 +1,187 @@
+# PARSEO TIPADO DE PRECIOS Y DIVISAS EN LA INGESTA
+# ==============================================
+# Parseo vectorizado de precios y conversión a la divisa base.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Comparativa con parsear fila a fila (y motivos de rechazo):
+#   python price_parsing.py --rows 1000000
+
+import argparse
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+BASE_CURRENCY = os.environ.get('ZARA_BASE_CURRENCY', 'EUR')
+FX_PATH = os.environ.get('ZARA_FX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fx_rates.csv'))
+ISSUE_COLUMNS = ['raw_price', 'currency', 'action', 'reason']
+PARSER_VERSION = 2  # Subirlo si cambia el criterio: invalida los datasets ya publicados
+
+# Lo que rodea al número: espacios (también el de no separación y el
+# estrecho que usan de separador de miles), apóstrofos de miles suizos,
+# símbolos y códigos ISO de divisa
+_DECORATION = "[\\s\u00a0\u202f'’€$£¥]|^[A-Za-z]{3}|[A-Za-z]{3}$"
+_NUMBER = r"-?[\d.,]*\d[\d.,]*"
+# Lo que queda de una celda que Excel convirtió en fecha
+_EXCEL_DATE = r"(\d{4})-(\d{2})-(\d{2})(?: 00:00:00)?"
+
+
+def load_fx_rates(path=FX_PATH):
+    """Tabla local de tipos de cambio: divisa → euros por unidad"""
+    rates = pd.read_csv(path)
+    return dict(zip(rates['currency'].str.strip().str.upper(), rates['eur_per_unit'].astype(float)))
+
+
+def parsing_signature(path=FX_PATH, base=BASE_CURRENCY):
+    """Bytes que fijan el resultado del parseo (criterio, divisa base y tabla de cambio) para versionar"""
+    with open(path, 'rb') as f:
+        return f"{PARSER_VERSION}:{base}:".encode() + f.read()
+
+
+def parsing_version(path=FX_PATH, base=BASE_CURRENCY):
+    """Hash corto de parsing_signature (lo guarda el manifiesto de una ingesta)"""
+    return hashlib.sha256(parsing_signature(path, base)).hexdigest()[:12]
+
+
+def parsing_stamp(path=FX_PATH, base=BASE_CURRENCY):
+    """Lo que cambia cuando cambia el parseo, sin leer la tabla: (criterio, divisa base, mtime, tamaño)"""
+    stat = os.stat(path)
+    return PARSER_VERSION, base, stat.st_mtime, stat.st_size
+
+
+def parse_decimal(values):
+    """Texto de precio en cualquier locale → float.
+    Devuelve (números, motivo de rechazo por fila, máscara de fechas de Excel)"""
+    raw = pd.Series(values).reset_index(drop=True)
+    missing = raw.isna().to_numpy()
+    text = raw.astype(str).astype('string[pyarrow]').fillna('').str.strip()
+
+    # Todo son kernels de texto de Arrow sobre la columna entera
+    cleaned = text.str.replace(_DECORATION, '', regex=True)
+    well_formed = cleaned.str.fullmatch(_NUMBER).fillna(False).to_numpy(dtype=bool)
+    dots = cleaned.str.count(r'\.').to_numpy(dtype=np.int64)
+    commas = cleaned.str.count(',').to_numpy(dtype=np.int64)
+    last_comma = cleaned.str.contains(r',\d*$').fillna(False).to_numpy(dtype=bool)  # Último separador: coma
+    last_dot = cleaned.str.contains(r'\.\d*$').fillna(False).to_numpy(dtype=bool)
+    three_after = cleaned.str.contains(r'[.,]\d{3}$').fillna(False).to_numpy(dtype=bool)
+
+    both = (dots > 0) & (commas > 0)
+    comma_decimal = last_comma & (commas == 1) & (both | ~three_after)
+    dot_decimal = last_dot & (dots == 1) & (both | ~three_after)
+    ambiguous = both & ~comma_decimal & ~dot_decimal  # El "decimal" se repite: "1.2.3,4,5"
+
+    normalized = cleaned.str.replace(r'[.,]', '', regex=True)  # Sin decimales: todo son miles
+    normalized = normalized.mask(dot_decimal, cleaned.str.replace(',', '', regex=False))
+    normalized = normalized.mask(comma_decimal, cleaned.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    numbers = np.full(len(raw), np.nan)
+    parsed = well_formed & ~ambiguous & ~missing
+    numbers[parsed] = normalized[parsed].astype('float64').to_numpy()
+
+    reason = np.full(len(raw), None, dtype=object)
+    reason[~well_formed] = 'formato no numérico'
+    reason[well_formed & ambiguous] = 'separadores ambiguos'
+    reason[missing] = 'precio vacío'
+    ok = pd.isna(reason)
+    reason[ok & ~(numbers > 0)] = 'precio no positivo'
+
+    # Celdas que Excel guardó como fecha: "27.9" → 27/09/<año>. Día.mes es
+    # solo una lectura probable ("27.90", "27.09"...): no pasa a precio
+    excel_date = text.str.fullmatch(_EXCEL_DATE).fillna(False).to_numpy(dtype=bool) & ~missing
+    if excel_date.any():
+        date_parts = text[excel_date].str.extract(_EXCEL_DATE)
+        day_month = date_parts[2].str.lstrip('0') + '.' + date_parts[1].str.lstrip('0')
+        reason[excel_date] = ('fecha de Excel, ¿' + day_month + '?: precio ambiguo').to_numpy(dtype=object)
+    numbers[~pd.isna(reason)] = np.nan
+    return numbers, reason, excel_date
+
+
+def parse_prices(price, currency, base=BASE_CURRENCY, rates=None):
+    """Precio en texto + divisa → (precio base, precio original, incidencias)"""
+    rates = load_fx_rates() if rates is None else rates
+    if base not in rates:
+        raise ValueError(f"La divisa base {base} no está en la tabla de tipos de cambio")
+    local, reason, excel_date = parse_decimal(price)
+
+    codes = pd.Series(currency).astype('string').str.strip().str.upper().reset_index(drop=True)
+    to_eur = codes.map(rates).astype(float).to_numpy()
+    priced = pd.isna(reason)
+    no_code = codes.isna().to_numpy() | (codes == '').fillna(True).to_numpy(dtype=bool)
+    reason[priced & no_code] = 'sin divisa'
+    unknown = priced & ~no_code & np.isnan(to_eur)
+    reason[unknown] = ('divisa sin tipo de cambio: ' + codes[unknown]).to_numpy(dtype=object)
+    local[~pd.isna(reason)] = np.nan
+    converted = np.round(local * to_eur / rates[base], 2)
+
+    index = pd.Series(price).index
+    flagged = ~pd.isna(reason)
+    issues = pd.DataFrame({
+        'raw_price': pd.Series(price).to_numpy(dtype=object)[flagged],
+        'currency': pd.Series(currency).to_numpy(dtype=object)[flagged],
+        'action': np.where(excel_date[flagged], 'ambigua', 'rechazada'),
+        'reason': reason[flagged],
+    }, index=index[flagged])
+    return (pd.Series(converted, index=index, name='price'),
+            pd.Series(local, index=index, name='price_local'), issues)
+
+
+# ==============================================
+# COMPARATIVA CON EL PARSEO FILA A FILA
+# ==============================================
+def _parse_one(value):
+    """Mismo criterio que parse_decimal, para un valor y en Python puro"""
+    text = re.sub(_DECORATION, '', str(value).strip())
+    if not re.fullmatch(_NUMBER, text):
+        return np.nan
+    dots, commas = text.count('.'), text.count(',')
+    if dots and commas:
+        decimal = ',' if text.rfind(',') > text.rfind('.') else '.'
+        if text.count(decimal) > 1:
+            return np.nan
+    elif dots == 1 and len(text) - text.rfind('.') - 1 != 3:
+        decimal = '.'
+    elif commas == 1 and len(text) - text.rfind(',') - 1 != 3:
+        decimal = ','
+    else:
+        decimal = None
+    whole, _, fraction = text.rpartition(decimal) if decimal else (text, '', '')
+    number = float(re.sub(r'[.,]', '', whole) + '.' + fraction) if decimal else float(re.sub(r'[.,]', '', text))
+    return number if number > 0 else np.nan
+
+
+def synthetic_prices(rows, seed=0):
+    """Precios en los formatos que se ven en las hojas de distintos mercados"""
+    rng = np.random.default_rng(seed)
+    value = np.round(rng.lognormal(3.5, 0.8, rows), 2)
+    formats = [
+        lambda v: f"{v:.2f}", lambda v: f"{v:.2f}".replace('.', ','), lambda v: f"{v:,.2f} €",
+        lambda v: f"{v:,.2f}".replace(',', ' ').replace('.', ',') + ' EUR', lambda v: f"$ {v:,.2f}",
+        lambda v: f"{v:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'), lambda v: "n/d",
+    ]
+    choice = rng.choice(len(formats), rows, p=[0.4, 0.2, 0.1, 0.1, 0.1, 0.09, 0.01])
+    return pd.Series([formats[c](v) for c, v in zip(choice, value)]), value
+
+
+def main():
+    from benchmarks import timed
+
+    parser = argparse.ArgumentParser(description="Parseo vectorizado de precios vs fila a fila")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    prices, truth = synthetic_prices(args.rows)
+    (numbers, reason, _), vector_s = timed(parse_decimal, prices)
+    reference, loop_s = timed(lambda: prices.map(_parse_one).to_numpy(dtype=float))
+
+    assert np.allclose(numbers, reference, equal_nan=True)
+    ok = ~np.isnan(numbers)
+    assert np.allclose(numbers[ok], truth[ok])
+    print(f"💶 {args.rows:,} precios · {ok.mean():.1%} válidos · motivos: "
+          f"{pd.Series(reason).value_counts().to_dict()}")
+    print(f"   vectorizado: {vector_s:.2f}s · fila a fila: {loop_s:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
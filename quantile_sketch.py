@@ -0,0 +1,229 @@
+# SKETCHES DE CUANTILES E HISTOGRAMAS POR CELDA DEL CUBO
+# ==============================================
+# Sketches de cuantiles e histogramas por celda, fusionables entre filtros.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Error y tiempo frente a describe() exacto sobre un catálogo sintético:
+#   python quantile_sketch.py --rows 2000000 --accuracy 0.01
+
+import argparse
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ['section', 'Product Position', 'Promotion', 'Seasonal']
+SKETCH_COLUMNS = ['price', 'Sales Volume', 'Revenue']
+QUANTILES = [0.25, 0.5, 0.75]
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+# Error relativo máximo de los cuantiles (0.01 → ±1% del valor exacto)
+RELATIVE_ACCURACY = float(os.environ.get('ZARA_SKETCH_ACCURACY', '0.01'))
+HISTOGRAM_BINS = 20  # Bins fijos del histograma de precios
+
+
+def _gamma(accuracy):
+    return (1 + accuracy) / (1 - accuracy)
+
+
+def _keys(magnitudes, gamma):
+    """Bucket logarítmico de cada valor: (gamma^(k-1), gamma^k]"""
+    return np.ceil(np.log(magnitudes) / np.log(gamma)).astype(np.int64)
+
+
+class QuantileSketch:
+    """Sketch de cuantiles mergeable con buckets logarítmicos y momentos exactos"""
+
+    def __init__(self, accuracy, offset, positive, negative, zeros=0,
+                 count=0, total=0.0, squares=0.0, low=np.inf, high=-np.inf):
+        self.accuracy = accuracy
+        self.offset = offset  # Clave del primer bucket
+        self.positive = positive
+        self.negative = negative
+        self.zeros = zeros
+        self.count = count
+        self.total = total
+        self.squares = squares
+        self.low = low
+        self.high = high
+
+    def merge(self, other):
+        """Sketch de la unión de los dos conjuntos de valores"""
+        if (self.accuracy, self.offset, len(self.positive)) != (other.accuracy, other.offset, len(other.positive)):
+            raise ValueError("Solo se pueden fusionar sketches con la misma precisión y rango de buckets")
+        return QuantileSketch(
+            self.accuracy, self.offset, self.positive + other.positive, self.negative + other.negative,
+            self.zeros + other.zeros, self.count + other.count, self.total + other.total,
+            self.squares + other.squares, min(self.low, other.low), max(self.high, other.high),
+        )
+
+    def quantile(self, q):
+        """Cuantil(es) con interpolación lineal como pandas, con error relativo ≤ accuracy"""
+        q = np.asarray(q, dtype=float)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        # Buckets en orden de valor: negativos (de mayor a menor magnitud), ceros, positivos
+        gamma = _gamma(self.accuracy)
+        keys = self.offset + np.arange(len(self.positive))
+        centers = 2 * gamma ** keys / (gamma + 1)  # Punto con error relativo ≤ accuracy en su bucket
+        counts = np.concatenate([self.negative[::-1], [self.zeros], self.positive])
+        values = np.concatenate([-centers[::-1], [0.0], centers])
+        cumulative = np.cumsum(counts)
+        rank = q * (self.count - 1)
+        lower = values[np.searchsorted(cumulative, np.floor(rank), side='right')]
+        upper = values[np.searchsorted(cumulative, np.ceil(rank), side='right')]
+        result = lower + (rank - np.floor(rank)) * (upper - lower)
+        return np.clip(result, self.low, self.high)
+
+    def describe(self):
+        """Mismas filas que DataFrame.describe(): momentos exactos y cuartiles del sketch"""
+        n = self.count
+        mean = self.total / n if n else np.nan
+        std = np.sqrt(max(self.squares - self.total * mean, 0.0) / (n - 1)) if n > 1 else np.nan
+        low, high = (self.low, self.high) if n else (np.nan, np.nan)
+        return pd.Series([float(n), mean, std, low, *self.quantile(QUANTILES), high], index=DESCRIBE_INDEX)
+
+
+class SketchCube:
+    """Sketches e histograma de precios de cada celda como matrices [celda, bucket]"""
+
+    def __init__(self, data, accuracy=RELATIVE_ACCURACY, bins=HISTOGRAM_BINS,
+                 dimensions=CUBE_DIMENSIONS, columns=SKETCH_COLUMNS):
+        self.accuracy = accuracy
+        self.dimensions = list(dimensions)
+        self.values = {}  # dimensión → {valor: código}
+        cell = np.zeros(len(data), dtype=np.int64)
+        keep = data['price'].notna().to_numpy(copy=True)
+        for dim in self.dimensions:
+            codes, uniques = pd.factorize(data[dim])
+            self.values[dim] = {value: code for code, value in enumerate(uniques)}
+            cell = cell * max(len(uniques), 1) + codes
+            keep &= codes >= 0
+        self.size = int(np.prod([max(len(v), 1) for v in self.values.values()]))
+        cell = cell[keep]
+
+        # Rango de todo el dataset, el mismo que el del filtro de precio por defecto
+        prices = data['price'].to_numpy(dtype=float)
+        self.price_range = (float(np.nanmin(prices)), float(np.nanmax(prices))) if keep.any() else (0.0, 0.0)
+        self.edges = np.linspace(*self.price_range, bins + 1)
+        self.histogram_counts = self._bin(cell, prices[keep], self.size)
+        self.stores = {column: self._store(cell, data[column].to_numpy(dtype=float)[keep]) for column in columns}
+
+    def _bin(self, cell, prices, size):
+        """Conteos [celda, bin] sobre los bins fijos del rango de precios"""
+        bins = len(self.edges) - 1
+        low, high = self.price_range
+        width = (high - low) or 1.0
+        bucket = np.clip(((prices - low) / width * bins).astype(np.int64), 0, bins - 1)
+        return np.bincount(cell * bins + bucket, minlength=size * bins).reshape(size, bins)
+
+    def _store(self, cell, x):
+        """Contadores por (celda, bucket) y momentos por celda de una columna"""
+        finite = np.isfinite(x)
+        cell, x = cell[finite], x[finite]
+        gamma = _gamma(self.accuracy)
+        nonzero = x != 0
+        keys = _keys(np.abs(x[nonzero]), gamma)
+        offset = int(keys.min()) if len(keys) else 0
+        width = int(keys.max()) - offset + 1 if len(keys) else 1
+        flat = cell[nonzero] * width + (keys - offset)
+        negative = x[nonzero] < 0
+
+        def buckets(select):
+            return np.bincount(flat[select], minlength=self.size * width).reshape(self.size, width)
+
+        low = np.full(self.size, np.inf)
+        high = np.full(self.size, -np.inf)
+        np.minimum.at(low, cell, x)
+        np.maximum.at(high, cell, x)
+        return {
+            'offset': offset,
+            'positive': buckets(~negative),
+            'negative': buckets(negative),
+            'zeros': np.bincount(cell[~nonzero], minlength=self.size),
+            'count': np.bincount(cell, minlength=self.size),
+            'total': np.bincount(cell, weights=x, minlength=self.size),
+            'squares': np.bincount(cell, weights=x * x, minlength=self.size),
+            'low': low,
+            'high': high,
+        }
+
+    def cells(self, selections):
+        """Índices de las celdas de una selección (una lista de valores por dimensión)"""
+        index = np.zeros(1, dtype=np.int64)
+        for dim, values in zip(self.dimensions, selections):
+            codes = np.array([self.values[dim][v] for v in values if v in self.values[dim]], dtype=np.int64)
+            index = (index[:, None] * max(len(self.values[dim]), 1) + codes).ravel()
+        return index
+
+    def sketch(self, column, cells):
+        """Sketch de una columna fusionando las celdas indicadas"""
+        store = self.stores[column]
+        return QuantileSketch(
+            self.accuracy, store['offset'],
+            store['positive'][cells].sum(axis=0), store['negative'][cells].sum(axis=0),
+            int(store['zeros'][cells].sum()), int(store['count'][cells].sum()),
+            float(store['total'][cells].sum()), float(store['squares'][cells].sum()),
+            float(store['low'][cells].min(initial=np.inf)), float(store['high'][cells].max(initial=-np.inf)),
+        )
+
+    def describe(self, cells):
+        """Equivalente a describe() de las columnas del cubo sobre las celdas indicadas"""
+        return pd.DataFrame({column: self.sketch(column, cells).describe() for column in self.stores})
+
+    def _histogram_frame(self, counts):
+        return pd.DataFrame({'desde': self.edges[:-1], 'hasta': self.edges[1:], 'productos': counts})
+
+    def histogram(self, cells):
+        """Histograma de precios (bins fijos) de las celdas indicadas"""
+        return self._histogram_frame(self.histogram_counts[cells].sum(axis=0))
+
+    def histogram_of(self, prices):
+        """Mismo histograma calculado sobre unos precios cualesquiera (p. ej. con rango de precio)"""
+        prices = np.asarray(prices, dtype=float)
+        prices = prices[np.isfinite(prices)]
+        return self._histogram_frame(self._bin(np.zeros(len(prices), dtype=np.int64), prices, 1)[0])
+
+
+# ==============================================
+# COMPARATIVA CON DESCRIBE() EXACTO
+# ==============================================
+def _exact_describe(data, dimensions, selections):
+    mask = data['price'].notna().to_numpy(copy=True)
+    for dim, values in zip(dimensions, selections):
+        mask &= data[dim].isin(values).to_numpy()
+    return data.loc[mask, SKETCH_COLUMNS].describe()
+
+
+def main():
+    from benchmarks import synthetic_catalog, timed
+
+    parser = argparse.ArgumentParser(description="describe() desde sketches fusionados vs exacto")
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--accuracy', type=float, default=RELATIVE_ACCURACY)
+    args = parser.parse_args()
+
+    data = synthetic_catalog(args.rows)
+    cube, build_s = timed(SketchCube, data, accuracy=args.accuracy)
+    print(f"🧊 {len(data):,} filas · {cube.size} celdas · construido en {build_s:.2f}s")
+
+    # Todas las combinaciones de "un valor o todos" en cada dimensión
+    options = [[list(cube.values[dim])] + [[v] for v in cube.values[dim]] for dim in cube.dimensions]
+    worst, sketch_s, exact_s = 0.0, 0.0, 0.0
+    for selections in itertools.product(*options):
+        approx, seconds = timed(lambda: cube.describe(cube.cells(selections)))
+        sketch_s += seconds
+        exact, seconds = timed(_exact_describe, data, cube.dimensions, selections)
+        exact_s += seconds
+        if exact.loc['count'].min() > 0:
+            quartiles = ['25%', '50%', '75%']
+            error = (approx.loc[quartiles] / exact.loc[quartiles] - 1).abs().to_numpy().max()
+            worst = max(worst, error)
+    combos = int(np.prod([len(o) for o in options]))
+    print(f"   {combos} combinaciones · peor error relativo en cuartiles: {worst:.4f} (cota {args.accuracy})")
+    print(f"   sketches: {sketch_s / combos * 1000:.2f} ms/describe · exacto: {exact_s / combos * 1000:.1f} ms/describe")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# DATASET COMPARTIDO ENTRE PROCESOS (ARROW + MEMORY MAP)
+# ==============================================
+# Dataset Arrow mapeado en memoria y compartido entre procesos.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso (p. ej. en el paso de build del deploy):
+#   python shared_dataset.py
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from price_parsing import parsing_stamp, parsing_version
+from zara_data import DATA_CACHE_DIR, DATA_PATH, dataset_version, read_dataset
+
+# Texto largo o muy repetido: solo lo leen la tabla, el hover y el contexto de la IA
+TEXT_COLUMNS = ['name', 'description', 'url', 'sku', 'terms']
+MANIFEST_PATH = os.path.join(DATA_CACHE_DIR, 'ingest_manifest.json')  # Lo escribe ingest_workbooks.py
+
+# Las columnas de texto se quedan respaldadas por Arrow (sin copiar a objetos Python)
+_ARROW_STRINGS = {
+    pa.string(): pd.StringDtype('pyarrow'),
+    pa.large_string(): pd.StringDtype('pyarrow'),
+}
+
+
+def dataset_path(version, directory=DATA_CACHE_DIR):
+    return os.path.join(directory, f"raw_zara-{version}.arrow")
+
+
+def _to_arrow(df):
+    """DataFrame → Table conservando NaN en floats para poder leerlos sin copia"""
+    columns = {}
+    for name in df.columns:
+        col = df[name]
+        if pd.api.types.is_float_dtype(col):
+            columns[name] = pa.array(col.to_numpy(), from_pandas=False)
+        elif name in TEXT_COLUMNS:
+            columns[name] = pa.array(col, from_pandas=True).cast(pa.string()).dictionary_encode()
+        else:
+            columns[name] = pa.array(col, from_pandas=True)
+    return pa.table(columns)
+
+
+def publish_dataset(df, version, directory=DATA_CACHE_DIR):
+    """Escribe el dataset como Arrow IPC de forma atómica y devuelve la ruta"""
+    os.makedirs(directory, exist_ok=True)
+    path = dataset_path(version, directory)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    table = _to_arrow(df)
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def _text_column(chunked):
+    """Diccionario de Arrow → Categorical cuyas categorías siguen sobre el mapa"""
+    array = chunked.combine_chunks() if chunked.num_chunks != 1 else chunked.chunk(0)
+    codes = array.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int32, copy=False)
+    categories = pd.Index(pd.arrays.ArrowStringArray(array.dictionary))
+    return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+
+
+def map_dataset(path):
+    """Mapea el fichero en solo lectura y lo expone como DataFrame sin copia"""
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    text = [name for name in table.column_names if pa.types.is_dictionary(table.schema.field(name).type)]
+    df = table.drop_columns(text).to_pandas(split_blocks=True, types_mapper=_ARROW_STRINGS.get)
+    for name in text:
+        df[name] = _text_column(table.column(name))
+    return df[table.column_names]
+
+
+def memory_report(df):
+    """Bytes de las columnas analíticas, de los códigos de texto y de sus diccionarios (en el mapa)"""
+    report = {"analiticas": 0, "texto_codigos": 0, "texto_diccionario": 0}
+    for name in df.columns:
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            report["texto_codigos"] += col.cat.codes.nbytes
+            report["texto_diccionario"] += int(col.cat.categories.memory_usage(deep=True))
+        elif name in TEXT_COLUMNS:
+            report["texto_diccionario"] += int(col.memory_usage(deep=True, index=False))
+        else:
+            report["analiticas"] += int(col.memory_usage(deep=True, index=False))
+    return report
+
+
+def read_manifest(manifest=MANIFEST_PATH):
+    """Última ingesta de varios libros ({version, path, sheet, parsing, files}), o None si no hay"""
+    try:
+        with open(manifest, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_manifest(source):
+    return source.endswith('.json')
+
+
+def current_source(data_path=None, manifest=MANIFEST_PATH):
+    """El Excel indicado, o el manifiesto de la última ingesta, o el Excel por defecto"""
+    if data_path is not None:
+        return data_path
+    return manifest if read_manifest(manifest) is not None else DATA_PATH
+
+
+def _read_source_manifest(source):
+    manifest = read_manifest(source)
+    if manifest is None:
+        raise ValueError(f"No se puede leer el manifiesto de ingesta {source}")
+    return manifest
+
+
+def is_stale(manifest):
+    """La ingesta se parseó con otro criterio, otra divisa base u otra tabla de cambio"""
+    return manifest.get('parsing') != parsing_version()
+
+
+def source_stamp(source):
+    """(ruta, mtime, tamaño, sello del parseo) del origen, sin leerlo"""
+    stat = os.stat(source)
+    return source, stat.st_mtime, stat.st_size, parsing_stamp()
+
+
+def source_version(source):
+    """Versión del dataset de un origen sin cargarlo (None si su ingesta hay que rehacerla)"""
+    if is_manifest(source):
+        manifest = _read_source_manifest(source)
+        return None if is_stale(manifest) else manifest['version']
+    return dataset_version(source)
+
+
+def source_parts(source, version):
+    """{libro: versión} de esa versión de una ingesta, o None"""
+    manifest = read_manifest(source) if is_manifest(source) else None
+    if manifest is None or manifest.get('version') != version:
+        return None
+    return {os.path.splitext(os.path.basename(report['file']))[0]: report['version']
+            for report in manifest['files'] if report['error'] is None}
+
+
+def appended_parts(old, new):
+    """Libros que `new` añade a `old`, o None si alguno se ha quitado o reescrito"""
+    if old is None or new is None or any(new.get(name) != version for name, version in old.items()):
+        return None
+    return [name for name in new if name not in old]
+
+
+def load_source(source, directory=DATA_CACHE_DIR):
+    """Devuelve (df, version) de un origen, parseándolo solo si nadie lo ha publicado"""
+    if is_manifest(source):
+        manifest = _read_source_manifest(source)
+        if is_stale(manifest):
+            from ingest_workbooks import reingest  # Diferido: ingest_workbooks importa este módulo
+            manifest = reingest(source)
+        return map_dataset(manifest['path']), manifest['version']
+    version = dataset_version(source)
+    path = dataset_path(version, directory)
+    if not os.path.exists(path):
+        publish_dataset(read_dataset(source), version, directory)
+    return map_dataset(path), version
+
+
+def load_shared_dataset(data_path=None, directory=DATA_CACHE_DIR):
+    """(df, version) del origen vigente (ver current_source)"""
+    return load_source(current_source(data_path), directory)
+
+
+if __name__ == '__main__':
+    version = dataset_version()  # Publica el Excel por defecto (la ingesta de varios libros publica la suya)
+    path = publish_dataset(read_dataset(), version)
+    print(f"✅ Dataset {version} publicado en {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    print(f"   Memoria al mapearlo (bytes): {memory_report(map_dataset(path))}")
@@ -0,0 +1,96 @@
+# VISTA POR DEFECTO PRERENDERIZADA (PRIMER PINTADO INSTANTÁNEO)
+# ==============================================
+# Vista por defecto prerenderizada por versión del dataset para el primer pintado.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso (p. ej. en el paso de build del deploy, después de shared_dataset.py):
+#   python static_view.py
+
+import json
+import os
+import time
+
+from current_catalog import load_current_catalog
+from shared_dataset import DATA_CACHE_DIR, current_source, load_shared_dataset, source_parts
+from zara_views import (
+    FilteredView, build_catalog, compute_aggregates, default_filters, filter_view, view_kpis
+)
+
+# Gráficos de la vista estática: los de agregados (el de precio-volumen
+# tiene un punto por producto y crecería con el dataset)
+STATIC_CHARTS = ['sales_by_position', 'section_distribution', 'top_products', 'revenue_by_section_position']
+
+
+def static_view_path(dataset_version, directory=DATA_CACHE_DIR):
+    return os.path.join(directory, f"default_view-{dataset_version}.json")
+
+
+def render_static_view(data, version, catalog, dataset_version):
+    """KPIs, figuras y top 20 de la vista por defecto de una versión del dataset"""
+    from chart_factory import ChartFactory
+
+    filters = default_filters(catalog)
+    view = filter_view(data, filters)
+    aggregates = compute_aggregates(view, version, filters)
+    charts = ChartFactory()
+    figures = {
+        'sales_by_position': charts.sales_by_position(aggregates['sales_by_position']),
+        'section_distribution': charts.section_distribution(aggregates['section_dist']),
+        'top_products': charts.top_products(aggregates['top_products']),
+        'revenue_by_section_position': charts.revenue_by_section_position(aggregates['revenue_analysis']),
+    }
+    top_20 = aggregates['top_20']
+    return {
+        'version': version,
+        'dataset_version': dataset_version,
+        'rendered_at': time.time(),
+        'catalog': catalog,
+        'kpis': view_kpis(view),
+        'totals': view_kpis(FilteredView(data)),
+        'figures': {name: figures[name].to_dict() for name in STATIC_CHARTS},
+        'top_20': {'columns': list(top_20.columns), 'data': top_20.to_numpy().tolist()},
+    }
+
+
+def publish_static_view(spec, directory=DATA_CACHE_DIR):
+    """Escribe la vista de su versión del dataset (escritura atómica); devuelve la ruta"""
+    from plotly.utils import PlotlyJSONEncoder  # Arrays de numpy de las figuras
+
+    os.makedirs(directory, exist_ok=True)
+    path = static_view_path(spec['dataset_version'], directory)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, cls=PlotlyJSONEncoder, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def load_static_view(dataset_version, directory=DATA_CACHE_DIR):
+    """Vista prerenderizada de esa versión del dataset, o None"""
+    try:
+        with open(static_view_path(dataset_version, directory), encoding='utf-8') as f:
+            spec = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if spec.get('dataset_version') != dataset_version:
+        return None
+    spec['catalog']['price'] = tuple(spec['catalog']['price'])  # El slider espera una tupla
+    return spec
+
+
+def build_static_view(snapshot, directory=DATA_CACHE_DIR):
+    """Builder del refresco: prerenderiza y publica la vista (sobre el catálogo actual) de cada nueva versión"""
+    current = snapshot.extras['current']
+    spec = render_static_view(current['df'], current['version'], current['catalog'], snapshot.version)
+    return publish_static_view(spec, directory)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    data, dataset_version = load_shared_dataset()
+    df, version = load_current_catalog(data, dataset_version, source_parts(current_source(), dataset_version))
+    spec = render_static_view(df, version, build_catalog(df), dataset_version)
+    path = publish_static_view(spec)
+    print(f"✅ Vista por defecto {version} prerenderizada en {path} "
+          f"({os.path.getsize(path) / 1e3:.0f} KB, {time.perf_counter() - start:.1f}s)")
@@ -0,0 +1,210 @@
+# ÍNDICE DE BÚSQUEDA DE TEXTO (N-GRAMAS)
+# ==============================================
+# Índice de trigramas sobre name, description y terms por versión del dataset.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Comparativa con str.contains sobre un catálogo sintético:
+#   python text_search.py --rows 1000000 puffer "zip pocket"
+
+import argparse
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+SEARCH_FIELDS = ['name', 'description', 'terms']
+NGRAM = 3
+DOC_END = '\x1e\x1e'  # Fin de documento: ningún trigrama válido lo contiene
+BUILD_CHUNK = 50_000  # Documentos codificados por bloque al construir
+MEMO_SIZE = 64  # Palabras recientes cuyo resultado se guarda por campo
+_BITS = 21  # Bits por carácter Unicode en la clave del trigrama
+_MASK = (1 << _BITS) - 1
+
+
+def normalize(text):
+    """La búsqueda no distingue mayúsculas"""
+    return text.lower()
+
+
+def query_words(query):
+    """Palabras de una búsqueda: normalizadas, sin repetir y en orden estable"""
+    return tuple(sorted(set(normalize(query).split())))
+
+
+def _codepoints(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+
+def _gram_keys(cp):
+    """Clave entera de cada trigrama de una secuencia de caracteres"""
+    return (cp[:-2] << (2 * _BITS)) | (cp[1:-1] << _BITS) | cp[2:]
+
+
+def _dedupe(grams, docs):
+    """Pares (trigrama, documento) únicos, ordenados por trigrama y documento"""
+    order = np.lexsort((docs, grams))
+    grams, docs = grams[order], docs[order]
+    keep = np.ones(len(grams), dtype=bool)
+    keep[1:] = (grams[1:] != grams[:-1]) | (docs[1:] != docs[:-1])
+    return grams[keep], docs[keep]
+
+
+class _FieldIndex:
+    """Trigramas → valores únicos de un campo, en formato CSR"""
+
+    def __init__(self, values):
+        # Los textos repetidos (misma descripción en muchas filas) se indexan una vez
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Columna ya codificada como diccionario: sus categorías son los valores únicos
+            uniques = list(values.cat.categories.str.lower()) + ['']
+            codes = values.cat.codes.to_numpy().astype(np.int32)
+            codes[codes < 0] = len(uniques) - 1
+        else:
+            codes, uniques = pd.factorize(values.fillna('').astype(str).str.lower())
+        self.row_doc = codes
+        self.docs = np.asarray(uniques, dtype=object)
+        self.grams, self.offsets, self.postings = self._build(self.docs)
+        self._short = [i for i, doc in enumerate(self.docs) if len(doc) < NGRAM]
+        self._memo = OrderedDict()  # palabra → ids de valores que la contienen
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build(docs):
+        end = _codepoints(DOC_END[0])[0]
+        gram_parts, doc_parts = [], []
+        for start in range(0, len(docs), BUILD_CHUNK):
+            chunk = docs[start:start + BUILD_CHUNK]
+            cp = _codepoints(DOC_END.join(chunk) + DOC_END)
+            lengths = np.fromiter((len(doc) + len(DOC_END) for doc in chunk), dtype=np.int64, count=len(chunk))
+            doc_of = np.repeat(np.arange(start, start + len(chunk), dtype=np.int32), lengths)
+            valid = (cp[:-2] != end) & (cp[1:-1] != end) & (cp[2:] != end)
+            grams, doc_ids = _dedupe(_gram_keys(cp)[valid], doc_of[:-2][valid])
+            gram_parts.append(grams)
+            doc_parts.append(doc_ids)
+        if not gram_parts:
+            return np.empty(0, np.uint64), np.zeros(1, np.int64), np.empty(0, np.int32)
+        grams, postings = _dedupe(np.concatenate(gram_parts), np.concatenate(doc_parts))
+        keys, starts = np.unique(grams, return_index=True)
+        return keys, np.append(starts, len(grams)), postings
+
+    def _posting(self, i):
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def _lookup(self, gram):
+        i = np.searchsorted(self.grams, gram)
+        if i < len(self.grams) and self.grams[i] == gram:
+            return self._posting(i)
+        return self.postings[:0]
+
+    def doc_hits(self, word):
+        """Máscara de valores únicos que contienen la palabra como subcadena"""
+        with self._lock:
+            ids = self._memo.get(word)
+            if ids is not None:
+                self._memo.move_to_end(word)
+        if ids is None:
+            ids = np.flatnonzero(self._match(word)).astype(np.int32)
+            with self._lock:
+                self._memo[word] = ids
+                while len(self._memo) > MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        hit = np.zeros(len(self.docs), dtype=bool)
+        hit[ids] = True
+        return hit
+
+    def _match(self, word):
+        hit = np.zeros(len(self.docs), dtype=bool)
+        cp = _codepoints(word)
+        if len(cp) < NGRAM:
+            # Palabra corta: unión de los trigramas que la contienen (exacto)
+            parts = [(self.grams >> (k * _BITS)) & _MASK for k in (2, 1, 0)]
+            if len(cp) == 1:
+                found = (parts[0] == cp[0]) | (parts[1] == cp[0]) | (parts[2] == cp[0])
+            else:
+                found = ((parts[0] == cp[0]) & (parts[1] == cp[1])) | ((parts[1] == cp[0]) & (parts[2] == cp[1]))
+            for i in np.flatnonzero(found):
+                hit[self._posting(i)] = True
+            # Los textos de menos de NGRAM caracteres no tienen trigramas
+            for i in self._short:
+                hit[i] = word in self.docs[i]
+            return hit
+        # Palabra larga: intersección de listas, de la más corta a la más larga
+        lists = sorted((self._lookup(g) for g in np.unique(_gram_keys(cp))), key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+        if len(cp) > NGRAM and len(candidates):
+            # Tener todos los trigramas no garantiza que sean contiguos
+            found = pd.Series(self.docs[candidates]).str.contains(word, regex=False).to_numpy()
+            candidates = candidates[found]
+        hit[candidates] = True
+        return hit
+
+
+class NGramIndex:
+    """Un índice de trigramas por campo; una palabra coincide si aparece en cualquiera"""
+
+    def __init__(self, data, fields=SEARCH_FIELDS):
+        self.fields = {field: _FieldIndex(data[field]) for field in fields}
+        self.rows = len(data)
+
+    def mask(self, words):
+        """Máscara de filas que contienen todas las palabras (en cualquier campo)"""
+        mask = np.ones(self.rows, dtype=bool)
+        for word in words:
+            word = normalize(word)
+            word_mask = np.zeros(self.rows, dtype=bool)
+            for index in self.fields.values():
+                word_mask |= index.doc_hits(word)[index.row_doc]
+            mask &= word_mask
+        return mask
+
+    def search(self, query):
+        """Máscara de filas para una búsqueda en texto libre"""
+        return self.mask(query_words(query))
+
+
+def contains_mask(data, words, fields=SEARCH_FIELDS):
+    """Equivalente sin índice (escaneo con str.contains), para vistas sin índice"""
+    mask = np.ones(len(data), dtype=bool)
+    for word in words:
+        word_mask = np.zeros(len(data), dtype=bool)
+        for field in fields:
+            text = data[field].astype('string').fillna('').str.lower()
+            word_mask |= text.str.contains(word, regex=False).to_numpy(dtype=bool)
+        mask &= word_mask
+    return mask
+
+
+# ==============================================
+# COMPARATIVA CON STR.CONTAINS
+# ==============================================
+def main():
+    from benchmarks import synthetic_catalog, timed
+
+    parser = argparse.ArgumentParser(description="Índice de trigramas vs str.contains")
+    parser.add_argument('queries', nargs='*', default=['puffer', 'zip pocket', 'leather jacket', 'ref12'])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    data = synthetic_catalog(args.rows)[SEARCH_FIELDS]
+    data['name'] = data['name'] + ' REF' + pd.Series(np.arange(args.rows)).astype(str)  # Peor caso: todos distintos
+    index, build_s = timed(NGramIndex, data)
+    texts = sum(len(field.docs) for field in index.fields.values())
+    grams = sum(len(field.grams) for field in index.fields.values())
+    print(f"📚 {len(data):,} filas · {texts:,} textos únicos · {grams:,} trigramas · construido en {build_s:.1f}s")
+    print(f"{'búsqueda':20} {'filas':>10} {'str.contains ms':>16} {'índice ms':>10}")
+    for query in args.queries:
+        words = query_words(query)
+        expected, scan_s = timed(contains_mask, data, words)
+        found, index_s = timed(index.mask, words)
+        assert (found == expected).all(), query
+        print(f"{query:20} {int(found.sum()):10,} {scan_s * 1000:16.1f} {index_s * 1000:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+# ROLLUPS TEMPORALES INCREMENTALES (SCRAPED_AT)
+# ==============================================
+# Revenue, unidades y precio por día y semana, actualizados de forma incremental.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Simulación de meses de lotes diarios (ingesta y lectura de tendencias):
+#   python trend_rollups.py --days 720
+
+import argparse
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from price_parsing import parsing_signature
+from shared_dataset import DATA_CACHE_DIR, appended_parts
+
+ROLLUP_DIMENSIONS = ['section', 'Product Position', 'Promotion']
+GRAINS = ['daily', 'weekly']
+TREND_WINDOW = {'daily': 90, 'weekly': 52}  # Periodos que muestra una tendencia
+MEASURES = ['revenue', 'units', 'price_sum', 'price_count']
+VALUE_COLUMNS = ['Revenue', 'Sales Volume', 'price']
+ROLLUP_PATH = os.environ.get('ZARA_ROLLUP_PATH', os.path.join(DATA_CACHE_DIR, 'trend_rollups.pkl'))
+
+
+def _periods(timestamps, grain):
+    """Inicio del día o de la semana (lunes) de cada timestamp"""
+    day = timestamps.dt.normalize()
+    if grain == 'daily':
+        return day
+    return day - pd.to_timedelta(day.dt.weekday, unit='D')
+
+
+def _period_step(grain):
+    return pd.Timedelta(days=1 if grain == 'daily' else 7)
+
+
+def _empty_table():
+    columns = {'period': pd.Series(dtype='datetime64[ns]')}
+    columns.update({dim: pd.Series(dtype=object) for dim in ROLLUP_DIMENSIONS})
+    columns.update({measure: pd.Series(dtype=float) for measure in MEASURES})
+    return pd.DataFrame(columns)
+
+
+def batch_rollup(rows, timestamps, grain):
+    """Rollup de un lote de filas: sumas por (periodo, sección, posición, promoción)"""
+    keys = ['period'] + ROLLUP_DIMENSIONS
+    frame = pd.DataFrame({
+        'period': _periods(timestamps, grain).astype('datetime64[ns]'),
+        **{dim: rows[dim].to_numpy() for dim in ROLLUP_DIMENSIONS},
+        'revenue': rows['Revenue'].to_numpy(dtype=float),
+        'units': rows['Sales Volume'].to_numpy(dtype=float),
+        'price_sum': rows['price'].to_numpy(dtype=float),
+        'price_count': rows['price'].notna().to_numpy(dtype=float),
+    })
+    return frame.groupby(keys, sort=True, as_index=False, dropna=False)[MEASURES].sum()
+
+
+def _row_hashes(rows, timestamps):
+    """Hash por fila del instante, las dimensiones y los valores"""
+    hashes = pd.util.hash_array(timestamps.astype('datetime64[ns]').to_numpy().view(np.int64))
+    for column in VALUE_COLUMNS:
+        hashes = hashes * np.uint64(1000003) ^ pd.util.hash_array(rows[column].to_numpy(dtype=float))
+    for dim in ROLLUP_DIMENSIONS:
+        codes, uniques = pd.factorize(rows[dim], use_na_sentinel=False)
+        hashes = hashes * np.uint64(1000003) ^ pd.util.hash_array(np.asarray(uniques, dtype=object))[codes]
+    return hashes
+
+
+def day_digests(rows, timestamps):
+    """Huella de las filas de cada día: DataFrame indexado por día con nº de filas y suma de hashes"""
+    day = timestamps.dt.normalize().astype('datetime64[ns]').to_numpy()
+    hashes = _row_hashes(rows, timestamps) if len(rows) else np.empty(0, np.uint64)
+    order = np.argsort(day, kind='stable')
+    day, hashes = day[order], hashes[order]
+    days, starts, counts = np.unique(day, return_index=True, return_counts=True)
+    sums = np.add.reduceat(hashes, starts) if len(days) else np.empty(0, np.uint64)  # Módulo 2**64
+    return pd.DataFrame({'rows': counts, 'hash': sums}, index=pd.DatetimeIndex(days, name='day'))
+
+
+def merge_digests(old, new):
+    """Huella de la unión de dos conjuntos de filas distintos: por día se suman filas y hashes"""
+    days = old.index.union(new.index).rename('day')
+    old, new = old.reindex(days, fill_value=0), new.reindex(days, fill_value=0)
+    return pd.DataFrame({
+        'rows': old['rows'].to_numpy(dtype=np.int64) + new['rows'].to_numpy(dtype=np.int64),
+        'hash': old['hash'].to_numpy(dtype=np.uint64) + new['hash'].to_numpy(dtype=np.uint64),  # Módulo 2**64
+    }, index=days)
+
+
+def changed_days(old, new):
+    """Días cuya huella difiere entre dos versiones (también los que aparecen o desaparecen)"""
+    both = old.reindex(new.index.union(old.index))
+    now = new.reindex(both.index)
+    differs = (both['rows'] != now['rows']) | (both['hash'] != now['hash'])
+    return both.index[differs.to_numpy()]
+
+
+def replace_periods(table, partial, periods):
+    """Sustituye las filas de esos periodos por las del rollup parcial"""
+    if len(periods) == 0:
+        return table
+    cut = int(table['period'].searchsorted(periods.min(), side='left'))
+    tail = table.iloc[cut:]
+    tail = pd.concat([tail[~tail['period'].isin(periods)], partial], ignore_index=True)
+    tail = tail.sort_values(['period'] + ROLLUP_DIMENSIONS, kind='stable')
+    return pd.concat([table.iloc[:cut], tail], ignore_index=True)
+
+
+def add_rollup(table, partial):
+    """Suma un rollup parcial a la tabla: solo se reescriben los periodos que toca"""
+    periods = pd.DatetimeIndex(partial['period'].unique())
+    current = table[table['period'].isin(periods)]
+    merged = pd.concat([current, partial], ignore_index=True)
+    merged = merged.groupby(['period'] + ROLLUP_DIMENSIONS, sort=True, as_index=False, dropna=False)[MEASURES].sum()
+    return replace_periods(table, merged, periods)
+
+
+def _signature():
+    return hashlib.sha256(parsing_signature()).hexdigest()[:12]
+
+
+class TrendTables:
+    """Rollups de una versión del dataset, de solo lectura: cada snapshot publicado guarda los suyos"""
+
+    def __init__(self, tables, latest, version):
+        self.tables = tables
+        self.latest = latest
+        self.version = version
+
+    def trend(self, grain, selections=None):
+        """Últimos TREND_WINDOW periodos de una selección (None = todo)"""
+        table = self.tables[grain]
+        if table.empty:
+            return pd.DataFrame(columns=['period', 'revenue', 'units', 'avg_price'])
+        # Solo la cola de la tabla: el coste no depende de la longitud del histórico
+        first = table['period'].iloc[-1] - _period_step(grain) * (TREND_WINDOW[grain] - 1)
+        window = table.iloc[int(table['period'].searchsorted(first, side='left')):]
+        if selections is not None:
+            keep = np.ones(len(window), dtype=bool)
+            for dim, values in zip(ROLLUP_DIMENSIONS, selections):
+                keep &= window[dim].isin(values).to_numpy()
+            window = window[keep]
+        totals = window.groupby('period', sort=True)[MEASURES].sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_price = totals['price_sum'] / totals['price_count']
+        return pd.DataFrame({
+            'period': totals.index, 'revenue': totals['revenue'].to_numpy(),
+            'units': totals['units'].to_numpy(), 'avg_price': avg_price.to_numpy(),
+        })
+
+
+class TrendRollups:
+    """Rollups diario y semanal de un proceso, publicados como snapshots inmutables"""
+
+    def __init__(self, path=ROLLUP_PATH):
+        self.path = path
+        self.version = None  # Versión del dataset que reflejan las tablas
+        self.parts = None  # {libro: versión} de esa versión, si es una ingesta
+        self.latest = None  # scraped_at más reciente
+        self.signature = _signature()
+        self.tables = {grain: _empty_table() for grain in GRAINS}
+        self.digests = day_digests(pd.DataFrame(), pd.Series([], dtype='datetime64[ns]'))
+        self.stats = {"batches": 0, "appends": 0, "rows": 0, "days": 0, "last_ms": 0.0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            # Tablas de otro parseo de precios (u otro formato): se rehacen desde el dataset
+            if state.get('signature') != self.signature:
+                return
+            self.version, self.parts, self.latest = state['version'], state.get('parts'), state['latest']
+            self.tables, self.digests = state['tables'], state['digests']
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        state = {'signature': self.signature, 'version': self.version, 'parts': self.parts, 'latest': self.latest,
+                 'tables': self.tables, 'digests': self.digests}
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)  # Escritura atómica
+
+    def ingest(self, data, version=None, parts=None):
+        """Pone las tablas al día con un dataset completo; devuelve cuántas filas agrupa"""
+        start = time.perf_counter()
+        with self._lock:
+            if version is not None and version == self.version:
+                return 0
+            added = appended_parts(self.parts, parts)
+            if added is not None:
+                data = data[data['source'].isin(added).to_numpy()]  # Solo los libros nuevos
+            timestamps = pd.to_datetime(data['scraped_at'], errors='coerce', format='ISO8601')
+            valid = timestamps.notna().to_numpy()
+            rows = data[ROLLUP_DIMENSIONS + VALUE_COLUMNS]  # Sin copiar las demás columnas
+            if not valid.all():
+                rows, timestamps = rows[valid], timestamps[valid]
+            digests = day_digests(rows, timestamps)
+            if added is not None:
+                if len(rows):
+                    self.tables = {grain: add_rollup(self.tables[grain], batch_rollup(rows, timestamps, grain))
+                                   for grain in GRAINS}
+                    self.latest = timestamps.max() if self.latest is None else max(self.latest, timestamps.max())
+                    self.stats["appends"] += 1
+                    self.stats["rows"] += len(rows)
+                    self.stats["days"] += len(digests)
+                self.digests = merge_digests(self.digests, digests)
+                self.version, self.parts = version, parts
+                self._save()
+                self.stats["last_ms"] = (time.perf_counter() - start) * 1000
+                return len(rows)
+            days = changed_days(self.digests, digests)
+            touched_rows = 0
+            if len(days):
+                days = pd.Series(days)
+                tables = {}
+                for grain in GRAINS:
+                    periods = pd.DatetimeIndex(_periods(days, grain).unique())
+                    touched = _periods(timestamps, grain).isin(periods).to_numpy()
+                    partial = batch_rollup(rows[touched], timestamps[touched], grain)
+                    tables[grain] = replace_periods(self.tables[grain], partial, periods)
+                    touched_rows = max(touched_rows, int(touched.sum()))
+                self.tables = tables
+                self.stats["batches"] += 1
+                self.stats["rows"] += touched_rows
+                self.stats["days"] += len(days)
+            self.digests = digests
+            self.latest = timestamps.max() if len(timestamps) else None
+            self.version, self.parts = version, parts
+            self._save()
+            self.stats["last_ms"] = (time.perf_counter() - start) * 1000
+            return touched_rows
+
+    def snapshot(self):
+        """Tablas de la versión plegada para un snapshot: la siguiente ingesta no las toca"""
+        return TrendTables(dict(self.tables), self.latest, self.version)
+
+    def trend(self, grain, selections=None):
+        return self.snapshot().trend(grain, selections)
+
+
+# ==============================================
+# SIMULACIÓN DE HISTÓRICO
+# ==============================================
+def synthetic_batch(base, day, seed=0):
+    """El catálogo real como si se hubiera scrapeado `day` días después"""
+    rng = np.random.default_rng(seed + day)
+    batch = base.copy()
+    scraped = pd.to_datetime(base['scraped_at'], format='ISO8601') + pd.Timedelta(days=day)
+    batch['scraped_at'] = scraped.dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+    batch['Sales Volume'] = np.maximum(1, base['Sales Volume'] * rng.lognormal(0, 0.2, len(base))).round()
+    batch['Revenue'] = batch['price'] * batch['Sales Volume']
+    return batch
+
+
+def main():
+    from zara_data import read_dataset
+
+    parser = argparse.ArgumentParser(description="Rollups incrementales sobre lotes diarios simulados")
+    parser.add_argument('--days', type=int, default=720)
+    args = parser.parse_args()
+
+    base = read_dataset()
+    rollups = TrendRollups(path=None)
+    history, parts = {}, {}
+
+    def add_workbook(name, batch, version='v1'):
+        history[name] = batch.assign(source=name)
+        parts[name] = version
+
+    print(f"{'días':>6} {'filas':>10} {'ingesta ms':>11} {'tendencia ms':>13} {'recalcular ms':>14}")
+    for day in range(args.days):
+        # Cada día llega un libro nuevo a la ingesta
+        add_workbook(f"dia-{day}", synthetic_batch(base, day))
+        if day == args.days // 2:
+            # Un mercado tardío con el scrape de hace 10 días (libro nuevo: se suma)
+            # y una corrección de precios del libro de hace 20 (reescrito: se reagrupan sus días)
+            add_workbook("mercado-tardio", synthetic_batch(base, day - 10, seed=1))
+            corrected = history[f"dia-{day - 20}"]
+            add_workbook(f"dia-{day - 20}", corrected.assign(Revenue=corrected['Revenue'] * 1.1), 'v2')
+        # Cada versión es la unión completa, como la que publica el refresco
+        data = pd.concat(history.values(), ignore_index=True)
+        rollups.ingest(data, str(day), dict(parts))
+        # Cada snapshot conserva sus tablas aunque la siguiente versión cambie las del proceso
+        if day == args.days // 2 - 1:
+            previous = rollups.snapshot()
+        if day == args.days // 2:
+            assert previous.version == str(day - 1) and previous.latest < rollups.latest
+        if day + 1 in (30, 180, 360, args.days):
+            start = time.perf_counter()
+            for grain in GRAINS:
+                rollups.trend(grain)
+            trend_ms = (time.perf_counter() - start) * 1000
+            # Referencia: rehacer los dos rollups desde todas las filas crudas
+            start = time.perf_counter()
+            timestamps = pd.to_datetime(data['scraped_at'], format='ISO8601')
+            full = {grain: batch_rollup(data, timestamps, grain) for grain in GRAINS}
+            full_ms = (time.perf_counter() - start) * 1000
+            for grain in GRAINS:
+                assert np.allclose(full[grain][MEASURES].to_numpy(), rollups.tables[grain][MEASURES].to_numpy())
+            print(f"{day + 1:6} {len(data):10,} {rollups.stats['last_ms']:11.1f} "
+                  f"{trend_ms:13.1f} {full_ms:14.1f}")
+    print(f"✅ {rollups.stats['appends']} versiones sumando solo sus libros nuevos · "
+          f"{rollups.stats['batches']} reagrupando días cambiados")
+
+
+if __name__ == '__main__':
+    main()
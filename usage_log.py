@@ -0,0 +1,54 @@
+# LOG DE USO DE FILTROS
+# ==============================================
+# Log rotado de cambios de filtros; el warm-up lee los estados más usados.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+import json
+import os
+import threading
+from collections import Counter
+
+from zara_data import DATA_CACHE_DIR
+from zara_views import FILTER_KEY_SIZE
+
+USAGE_LOG = os.environ.get('ZARA_USAGE_LOG', os.path.join(DATA_CACHE_DIR, 'filter_usage.jsonl'))
+USAGE_LOG_MAX_BYTES = int(float(os.environ.get('ZARA_USAGE_LOG_MAX_MB', 5)) * 1e6)
+DEFAULT_POPULAR = 10
+
+_log_lock = threading.Lock()
+
+
+def rotated_path(path=USAGE_LOG):
+    return f"{path}.1"
+
+
+def record_filter_state(filters, path=USAGE_LOG, max_bytes=USAGE_LOG_MAX_BYTES):
+    """Añade un estado de filtros (ver zara_views.filters_key) al log de uso"""
+    line = json.dumps([list(part) for part in filters], ensure_ascii=False)
+    with _log_lock:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+            full = f.tell() >= max_bytes
+        if full:
+            # La generación anterior se sustituye: como mucho 2 × max_bytes en disco
+            os.replace(path, rotated_path(path))
+
+
+def popular_filter_states(n=DEFAULT_POPULAR, path=USAGE_LOG):
+    """Los n estados de filtros más frecuentes del log (generación actual y anterior)"""
+    counts = Counter()
+    for part_path in (rotated_path(path), path):
+        if not os.path.exists(part_path):
+            continue
+        with open(part_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    parts = json.loads(line)
+                except ValueError:
+                    continue
+                if len(parts) != FILTER_KEY_SIZE:  # Línea de una versión anterior de los filtros
+                    continue
+                counts[tuple(tuple(part) for part in parts)] += 1
+    return [state for state, _ in counts.most_common(n)]
@@ -0,0 +1,156 @@
+# WARM-UP AL ARRANCAR EL SERVIDOR
+# ==============================================
+# Precalcula el dataset, la vista por defecto y los filtros más usados.
+# Autor: Workshop Zara Analytics
+# ==============================================
+#
+# Uso:
+#   python warmup.py                 # solo warm-up (p. ej. en el build)
+#   python warmup.py --serve         # warm-up + readiness + streamlit run
+#
+# Readiness: GET http://<host>:8502/ready → 200 si está caliente, 503 si no.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from current_catalog import load_current_catalog
+from shared_dataset import current_source, load_shared_dataset, source_parts
+from static_view import publish_static_view, render_static_view
+from usage_log import DEFAULT_POPULAR, popular_filter_states
+from zara_views import build_catalog, default_filters, warm_view
+
+READY_PORT = 8502
+APP_SCRIPT = 'dashboard_completo.py'
+
+
+# ==============================================
+# WARM-UP
+# ==============================================
+class WarmupState:
+    """Estado del warm-up consultado por el endpoint de readiness"""
+
+    def __init__(self):
+        self.status = 'cold'  # cold → warming → warm | failed
+        self.started = None
+        self.duration = None
+        self.steps = {}
+        self.error = None
+
+    def as_dict(self):
+        return {
+            "status": self.status,
+            "warmup_seconds": self.duration,
+            "steps": self.steps,
+            "error": self.error,
+        }
+
+
+def run_warmup(state, data_path=None, n_popular=DEFAULT_POPULAR):
+    """Precalcula dataset, catálogo, vista por defecto y estados populares"""
+    state.status = 'warming'
+    state.started = time.perf_counter()
+
+    def step(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        state.steps[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    try:
+        data, dataset_version = step('dataset', lambda: load_shared_dataset(data_path))
+        # Las sesiones arrancan sobre el catálogo actual (última fila de cada producto)
+        df, version = step('current_catalog', lambda: load_current_catalog(
+            data, dataset_version, source_parts(current_source(data_path), dataset_version)
+        ))
+        catalog = step('catalog', lambda: build_catalog(df))
+        step('default_view', lambda: warm_view(df, version, default_filters(catalog)))
+        step('static_view', lambda: publish_static_view(
+            render_static_view(df, version, catalog, dataset_version)
+        ))
+        popular = popular_filter_states(n_popular)
+        step('popular_views', lambda: [warm_view(df, version, filters) for filters in popular])
+        state.steps['popular_count'] = len(popular)
+        state.status = 'warm'
+    except Exception as e:
+        state.status = 'failed'
+        state.error = f"{type(e).__name__}: {e}"
+    state.duration = round(time.perf_counter() - state.started, 3)
+    return state
+
+
+# ==============================================
+# READINESS
+# ==============================================
+def streamlit_healthy(port):
+    """Health check nativo de Streamlit"""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+            return r.status == 200
+    except OSError:
+        return False
+
+
+def start_readiness_server(state, port=READY_PORT, app_port=None):
+    """Sirve /ready (warm + streamlit arriba) y /warmup (detalle) en un hilo"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            payload = state.as_dict()
+            app_up = app_port is None or streamlit_healthy(app_port)
+            payload["app"] = "up" if app_up else "down"
+            ready = state.status == 'warm' and app_up
+            status = 200 if ready or self.path == '/warmup' else 503
+            if self.path not in ('/ready', '/warmup'):
+                status = 404
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-up de cachés del dashboard")
+    parser.add_argument('--popular', type=int, default=DEFAULT_POPULAR, help="Estados de filtros a precalcular")
+    parser.add_argument('--serve', action='store_true', help="Arrancar también readiness y streamlit")
+    parser.add_argument('--port', type=int, default=8501, help="Puerto de streamlit")
+    parser.add_argument('--ready-port', type=int, default=READY_PORT)
+    args = parser.parse_args()
+
+    state = WarmupState()
+    if args.serve:
+        start_readiness_server(state, args.ready_port, args.port)
+    run_warmup(state, n_popular=args.popular)
+    print(f"🔥 Warm-up {state.status} en {state.duration}s · {state.steps}")
+    if state.error:
+        print(f"   ❌ {state.error}")
+    if not args.serve:
+        sys.exit(0 if state.status == 'warm' else 1)
+
+    app = subprocess.Popen([
+        sys.executable, '-m', 'streamlit', 'run', APP_SCRIPT,
+        '--server.port', str(args.port), '--server.headless', 'true',
+    ])
+    try:
+        sys.exit(app.wait())
+    except KeyboardInterrupt:
+        app.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# DATOS ZARA - CARGA Y VERSIONADO
+# ==============================================
+# Lectura del Excel con el precio ya parseado y versionado del dataset.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+import hashlib
+import os
+
+import pandas as pd
+
+from price_parsing import BASE_CURRENCY, ISSUE_COLUMNS, parse_prices, parsing_signature
+
+DATA_PATH = 'EADIC_claude_test.xlsx'
+SHEET_NAME = 'raw_zara'
+DATA_CACHE_DIR = os.environ.get('ZARA_DATA_DIR', '.zara_cache')
+QUARANTINE_DIR = os.path.join(DATA_CACHE_DIR, 'quarantine')
+
+# Esquema común de todas las hojas de scraping (una por mercado y día), en este orden
+COLUMNS = [
+    'Product ID', 'Product Position', 'Promotion', 'Product Category', 'Seasonal', 'Sales Volume',
+    'brand', 'url', 'sku', 'name', 'description', 'price', 'currency', 'scraped_at', 'terms', 'section',
+]
+NUMERIC_COLUMNS = ['Product ID', 'Sales Volume']  # price va aparte: texto con su divisa
+
+
+def normalize_dataset(df, base_currency=BASE_CURRENCY):
+    """Hoja cruda → esquema común. Devuelve (DataFrame, incidencias de precio)"""
+    df = df.rename(columns=lambda name: str(name).strip()).reindex(columns=COLUMNS)
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    price, price_local, issues = parse_prices(df['price'], df['currency'], base_currency)
+    df['price'] = price
+    df['price_local'] = price_local
+    df['Revenue'] = df['price'] * df['Sales Volume']
+    issues.insert(0, 'Product ID', df.loc[issues.index, 'Product ID'])
+    issues.insert(1, 'name', df.loc[issues.index, 'name'])
+    return df, issues
+
+
+def quarantine_path(path, sheet_name=SHEET_NAME, directory=QUARANTINE_DIR):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(directory, f"{stem}-{sheet_name}.csv")
+
+
+def write_quarantine(issues, path, sheet_name=SHEET_NAME, directory=QUARANTINE_DIR):
+    """Incidencias de precio de un libro (con su fila de Excel) a CSV; sin incidencias, se borra el anterior"""
+    target = quarantine_path(path, sheet_name, directory)
+    if issues.empty:
+        if os.path.exists(target):
+            os.remove(target)
+        return None
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    issues.rename_axis(None).assign(row=issues.index + 2)[['row', 'Product ID', 'name'] + ISSUE_COLUMNS].to_csv(
+        tmp, index=False
+    )
+    os.replace(tmp, target)  # Escritura atómica
+    return target
+
+
+def parse_dataset(path=DATA_PATH, sheet_name=SHEET_NAME, quarantine_dir=QUARANTINE_DIR):
+    """Carga el Excel con el precio tipado; devuelve (DataFrame, incidencias) y escribe la cuarentena"""
+    df, issues = normalize_dataset(pd.read_excel(path, sheet_name=sheet_name))
+    write_quarantine(issues, path, sheet_name, quarantine_dir)
+    return df, issues
+
+
+def read_dataset(path=DATA_PATH, sheet_name=SHEET_NAME):
+    """Carga y limpia los datos del Excel"""
+    return parse_dataset(path, sheet_name)[0]
+
+
+def data_fingerprint(df):
+    """Versión del contenido de un DataFrame (columnas + valores, sin índice)"""
+    digest = hashlib.sha1(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:12]
+
+
+def dataset_version(path=DATA_PATH):
+    """Versión del dataset: hash del contenido del fichero de origen y de cómo se parsean sus precios"""
+    digest = hashlib.sha256(parsing_signature())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
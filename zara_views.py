@@ -0,0 +1,240 @@
+# VISTAS DEL DASHBOARD (FILTROS Y AGREGADOS)
+# ==============================================
+# Filtros y agregados del dashboard, compartidos con el warm-up.
+# Autor: Workshop Zara Analytics
+# ==============================================
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache_backend import shared_cache
+from lift_analysis import SEGMENT_COLUMNS, segment_effects
+from quantile_sketch import SKETCH_COLUMNS, SketchCube
+from text_search import NGramIndex, contains_mask, query_words
+
+FILTER_DIMENSIONS = ['section', 'Product Position', 'Promotion', 'Seasonal']
+FILTER_KEY_SIZE = len(FILTER_DIMENSIONS) + 2  # Dimensiones + rango de precio + búsqueda
+EFFECT_COLUMNS = SEGMENT_COLUMNS + ['Promotion', 'price', 'Sales Volume']
+AGGREGATE_COLUMNS = ['name', 'section', 'Product Position', 'price', 'Sales Volume', 'Revenue', 'Promotion']
+# Columnas de la tabla de productos (el texto largo solo va en el CSV)
+TABLE_COLUMNS = [
+    'Product ID', 'name', 'section', 'Product Category', 'Product Position', 'Promotion', 'Seasonal',
+    'price', 'currency', 'price_local', 'Sales Volume', 'Revenue', 'scraped_at',
+]
+
+
+def build_catalog(data):
+    """Valores de cada filtro y rango de precios de una versión del dataset"""
+    catalog = {dim: list(data[dim].dropna().unique()) for dim in FILTER_DIMENSIONS}
+    catalog['price'] = (float(data['price'].min()), float(data['price'].max()))
+    return catalog
+
+
+def prepare_dataset(data, version):
+    """Lo que el dashboard precalcula por dataset: catálogo de filtros, índice de filtros y sketches"""
+    return {
+        'df': data, 'version': version, 'catalog': build_catalog(data),
+        'filter_index': build_filter_index(data), 'sketches': build_sketches(data),
+    }
+
+
+def filters_key(sections, positions, promotions, seasonal, prices, search=''):
+    """Clave estable de unos filtros (orden de selección y de palabras irrelevante)"""
+    return (
+        tuple(sorted(sections)),
+        tuple(sorted(positions)),
+        tuple(sorted(promotions)),
+        tuple(sorted(seasonal)),
+        tuple(prices),
+        query_words(search),
+    )
+
+
+def default_filters(catalog):
+    """Filtros por defecto: todo seleccionado"""
+    return filters_key(*(catalog[dim] for dim in FILTER_DIMENSIONS), catalog['price'])
+
+
+def build_filter_index(data):
+    """Bitmaps por valor, precios ordenados e índice de texto de una versión"""
+    index = {
+        dim: {value: (data[dim] == value).to_numpy() for value in data[dim].dropna().unique()}
+        for dim in FILTER_DIMENSIONS
+    }
+    prices = data['price'].to_numpy(dtype=float)
+    order = np.argsort(prices, kind='stable')  # Los NaN quedan al final
+    index['price'] = (prices[order], order)
+    index['text'] = NGramIndex(data)
+    return index
+
+
+def build_sketches(data):
+    """Sketches de cuantiles e histogramas de precio por celda de las dimensiones de filtro"""
+    return SketchCube(data, dimensions=FILTER_DIMENSIONS)
+
+
+def sketch_cells(cube, filters):
+    """Celdas del cubo que forman unos filtros, o None"""
+    *selections, prices, words = filters
+    if words or tuple(prices) != cube.price_range:
+        return None
+    return cube.cells(selections)
+
+
+def index_mask(index, filters):
+    """Máscara de filas de unos filtros combinando los bitmaps del índice"""
+    *selections, prices, words = filters
+    sorted_prices, order = index['price']
+    mask = np.zeros(len(order), dtype=bool)
+    lo = np.searchsorted(sorted_prices, prices[0], side='left')
+    hi = np.searchsorted(sorted_prices, prices[1], side='right')
+    mask[order[lo:hi]] = True
+    for dim, values in zip(FILTER_DIMENSIONS, selections):
+        dim_mask = np.zeros(len(order), dtype=bool)
+        for value in values:
+            if value in index[dim]:
+                dim_mask |= index[dim][value]
+        mask &= dim_mask
+    if words:
+        mask &= index['text'].mask(words)
+    return mask
+
+
+def count_matches(index, filters):
+    """Nº de filas que cumplen unos filtros, sin tocar el DataFrame"""
+    return int(np.count_nonzero(index_mask(index, filters)))
+
+
+def filter_mask(data, filters):
+    """Máscara de unos filtros (ver filters_key) evaluada sobre el DataFrame, sin índice"""
+    sections, positions, promotions, seasonal, prices, words = filters
+    return (
+        (data['section'].isin(sections)) &
+        (data['Product Position'].isin(positions)) &
+        (data['Promotion'].isin(promotions)) &
+        (data['Seasonal'].isin(seasonal)) &
+        (data['price'] >= prices[0]) &
+        (data['price'] <= prices[1]) &
+        contains_mask(data, words)
+    ).to_numpy()
+
+
+class FilteredView:
+    """Filas de unos filtros como posiciones sobre el DataFrame base, sin copiarlo"""
+
+    def __init__(self, base, positions=None):
+        self.base = base
+        self.positions = positions  # None → todas las filas
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.base) if self.positions is None else len(self.positions)
+
+    def column(self, name):
+        """Una columna de las filas seleccionadas (con el índice original)"""
+        if self.positions is None:
+            return self.base[name]
+        with self._lock:
+            gathered = self._columns.get(name)
+        if gathered is None:
+            gathered = self.base[name].take(self.positions)
+            with self._lock:
+                gathered = self._columns.setdefault(name, gathered)
+        return gathered
+
+    def frame(self, columns=None):
+        """DataFrame con las columnas pedidas, reunido en cada llamada"""
+        if columns is None:
+            if self.positions is None:
+                return self.base
+            columns = list(self.base.columns)
+        if self.positions is None:
+            return self.base[columns]
+        return self.base[columns].take(self.positions)
+
+
+def filter_view(data, filters, index=None):
+    """Aplica unos filtros (ver filters_key) como FilteredView, con el índice si se pasa"""
+    mask = index_mask(index, filters) if index is not None else filter_mask(data, filters)
+    if mask.all():
+        return FilteredView(data)
+    return FilteredView(data, np.flatnonzero(mask))
+
+
+def view_kpis(view):
+    """KPIs de la cabecera: productos, revenue total, precio medio y unidades"""
+    return {
+        'products': len(view),
+        'revenue': float(view.column('Revenue').sum()),
+        'avg_price': float(view.column('price').mean()),
+        'units': view.column('Sales Volume').sum().item(),
+    }
+
+
+def decoded(frame):
+    """Texto codificado (Categorical) → texto plano en resultados pequeños que se cachean"""
+    text = {name: frame[name].cat.categories.dtype
+            for name in frame.columns if isinstance(frame[name].dtype, pd.CategoricalDtype)}
+    return frame.astype(text) if text else frame
+
+
+@shared_cache()
+def compute_aggregates(_view, version, filters):
+    """Agregados de gráficos y tablas, compartidos entre réplicas por (versión, filtros)"""
+    # Solo se reúnen las columnas que se agregan, y solo si no está en caché
+    _df_filtered = _view.frame(AGGREGATE_COLUMNS)
+    section_dist = _df_filtered['section'].value_counts().reset_index()
+    section_dist.columns = ['section', 'count']
+    return {
+        'sales_by_position': _df_filtered.groupby('Product Position')['Sales Volume'].sum().reset_index(),
+        'section_dist': section_dist,
+        'top_products': decoded(_df_filtered.nlargest(10, 'Revenue')[['name', 'Revenue']]),
+        'revenue_analysis': _df_filtered.groupby(['section', 'Product Position'])['Revenue'].sum().reset_index(),
+        'top_20': decoded(_df_filtered.nlargest(20, 'Revenue')[
+            ['name', 'section', 'Product Position', 'price', 'Sales Volume', 'Revenue', 'Promotion']
+        ]),
+    }
+
+
+@shared_cache()
+def compute_describe(_view, version, filters):
+    """describe() exacto de las columnas numéricas (ordena todas las filas de la vista)"""
+    return _view.frame(SKETCH_COLUMNS).describe()
+
+
+def describe_view(view, cube, version, filters, exact=False):
+    """describe() de la vista, por sketches si se puede. Devuelve (tabla, aproximada)"""
+    cells = None if exact else sketch_cells(cube, filters)
+    if cells is None:
+        return compute_describe(view, version, filters), False
+    return cube.describe(cells), True
+
+
+def price_histogram(view, cube, filters, exact=False):
+    """Histograma de precios en los bins fijos del cubo (de las celdas o de la vista)"""
+    cells = None if exact else sketch_cells(cube, filters)
+    if cells is None:
+        return cube.histogram_of(view.column('price'))
+    return cube.histogram(cells)
+
+
+@shared_cache()
+def compute_effects(_view, version, filters):
+    """Lift de promoción y posición y elasticidad precio por segmento de la vista"""
+    return segment_effects(_view.frame(EFFECT_COLUMNS))
+
+
+@shared_cache()
+def export_csv(_view, version, filters):
+    """CSV de los datos filtrados para el botón de descarga"""
+    return _view.frame().to_csv(index=False).encode('utf-8')
+
+
+def warm_view(data, version, filters):
+    """Calcula (o encuentra en caché) todo lo que necesita una vista"""
+    view = filter_view(data, filters)
+    compute_aggregates(view, version, filters)
+    export_csv(view, version, filters)